@@ -0,0 +1,172 @@
+"""
+Headless batch generator for gradation reports.
+
+Generates compliant random curves for one material spec and streams
+passing / retained / FM rows to CSV or NDJSON, or one sheet per sample to
+an xlsx workbook, without loading the GUI.
+
+    python -m cli --material fine --count 500 --weight 2000 --seed 42 --output fine.csv
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from config.materials import materials
+from core.fm_calculator import FMCalculator
+from core.gradation_engine import GradationEngine
+from core.material_spec import get_spec
+from core.random_generator import RandomCurveGenerator
+from core.total_weight import TotalWeightManager
+from core.workbook_exporter import StreamingWorkbookWriter
+
+
+def _sieve_label(size):
+    return size if isinstance(size, str) else f"{size:g}"
+
+
+def _row_format(fmt, sieve_labels, precision):
+    """
+    Build a single np.savetxt format string for one output row:
+    sample index, passing per sieve, retained per sieve, FM.
+    """
+    n = len(sieve_labels)
+    value = f"%.{precision}f"
+    if fmt == "csv":
+        return ",".join(["%d"] + [value] * (2 * n + 1))
+
+    values = ", ".join([value] * n)
+    return (
+        '{"sample": %d, '
+        f'"passing": [{values}], "retained": [{values}], "fm": {value}'
+        "}"
+    )
+
+
+def _header(fmt, sieve_labels):
+    if fmt != "csv":
+        return None
+    columns = ["sample"]
+    columns += [f"passing_{label}" for label in sieve_labels]
+    columns += [f"retained_{label}" for label in sieve_labels]
+    columns.append("fm")
+    return ",".join(columns)
+
+
+def generate_rows(material_key, count, total_weight=None, seed=None, method="uniform", chunk_size=10000):
+    """
+    Yield (start_index, passing, retained, fm) chunks of generated samples.
+    passing / retained are (chunk x sieves) arrays in table order.
+    """
+    spec = get_spec(material_key)
+    if total_weight is None:
+        total_weight = spec.default_weight
+
+    grad_engine = GradationEngine(TotalWeightManager(total_weight))
+    random_gen = RandomCurveGenerator(grad_engine)
+    fm_calc = FMCalculator()
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        passing = random_gen.generate_batch(
+            size, spec.sieve_sizes, spec.lower, spec.upper,
+            rng=rng, method=method, spec=spec
+        )
+        retained = grad_engine.passing_to_retained_batch(passing)
+        fm = fm_calc.calculate_fm_batch(retained)
+        yield start, passing, retained, fm
+
+
+def write_rows(out, material_key, count, fmt="csv", precision=4, **kwargs):
+    """
+    Stream generated samples to the open text stream out.
+    """
+    sieve_labels = [_sieve_label(s) for s in get_spec(material_key).sieve_sizes]
+    row_format = _row_format(fmt, sieve_labels, precision)
+
+    header = _header(fmt, sieve_labels)
+    if header:
+        out.write(header + "\n")
+
+    for start, passing, retained, fm in generate_rows(material_key, count, **kwargs):
+        index = np.arange(start, start + len(passing))
+        rows = np.column_stack([index, passing, retained, fm])
+        np.savetxt(out, rows, fmt=row_format)
+
+
+def write_workbook(path, material_key, count, sheets_per_file=StreamingWorkbookWriter.DEFAULT_SHEETS_PER_FILE,
+                   **kwargs):
+    """
+    Stream generated samples into an xlsx workbook, one sheet per sample,
+    using the material's sieve_range / column metadata. Beyond sheets_per_file
+    sheets, samples continue in numbered workbooks (report-2.xlsx, ...).
+    Returns the list of files written.
+    """
+    total_weight = kwargs.get("total_weight")
+    if total_weight is None:
+        total_weight = get_spec(material_key).default_weight
+
+    with StreamingWorkbookWriter(path, material_key, sheets_per_file=sheets_per_file) as writer:
+        for start, passing, retained, fm in generate_rows(material_key, count, **kwargs):
+            for offset in range(len(passing)):
+                writer.add_sheet(passing[offset], retained[offset], total_weight,
+                                 title=f"Sample {start + offset + 1}")
+    return writer.paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Generate compliant gradation curves in bulk (no GUI)."
+    )
+    parser.add_argument("--material", required=True, choices=sorted(materials),
+                        help="Material key from config/materials.py")
+    parser.add_argument("--count", type=int, required=True, help="Number of samples")
+    parser.add_argument("--weight", type=float, default=None,
+                        help="Total weight in grams (default: material default)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--format", dest="fmt", choices=("csv", "ndjson", "xlsx"), default="csv",
+                        help="xlsx writes one sheet per sample (requires openpyxl and --output)")
+    parser.add_argument("--method", choices=("uniform", "mcmc"), default="uniform",
+                        help="Sampling method (default: exact uniform)")
+    parser.add_argument("--sheets-per-file", type=int, default=StreamingWorkbookWriter.DEFAULT_SHEETS_PER_FILE,
+                        help="xlsx: sheets per workbook before rolling over to report-2.xlsx, ... "
+                             f"(default: {StreamingWorkbookWriter.DEFAULT_SHEETS_PER_FILE})")
+    parser.add_argument("--precision", type=int, default=4, help="Decimal places")
+    parser.add_argument("--chunk-size", type=int, default=10000,
+                        help="Samples generated per batch")
+    parser.add_argument("--output", "-o", default="-", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.count < 0:
+        parser.error("--count must be >= 0")
+    if args.weight is not None and args.weight <= 0:
+        parser.error("--weight must be > 0")
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be > 0")
+    if args.sheets_per_file <= 0:
+        parser.error("--sheets-per-file must be > 0")
+
+    options = dict(
+        total_weight=args.weight, seed=args.seed,
+        method=args.method, chunk_size=args.chunk_size
+    )
+
+    if args.fmt == "xlsx":
+        if args.output == "-":
+            parser.error("--format xlsx needs --output")
+        write_workbook(args.output, args.material, args.count, sheets_per_file=args.sheets_per_file, **options)
+        return 0
+
+    options.update(fmt=args.fmt, precision=args.precision)
+    if args.output == "-":
+        write_rows(sys.stdout, args.material, args.count, **options)
+    else:
+        with open(args.output, "w", newline="") as out:
+            write_rows(out, args.material, args.count, **options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
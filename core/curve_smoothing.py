@@ -0,0 +1,88 @@
+import numpy as np
+
+SMOOTHING_METHODS = ("linear", "pchip")
+
+
+class CurveSmoother:
+    """
+    Precomputed smoothing operator for curves sampled at x = 0, 1, ..., n-1.
+
+    Built once per material; smooth(values) is then a matrix-vector product.
+      linear: y = L @ values
+      pchip:  y = A @ values + B @ slopes, with shape-preserving (Fritsch-Carlson)
+              slopes computed in O(n) per call. A and B hold the cubic Hermite
+              basis evaluated at the sample points, so PCHIP never overshoots
+              the data and keeps monotonic curves monotonic.
+    With n <= 2 there is nothing to smooth and values are returned as-is.
+    """
+
+    def __init__(self, n, samples_per_segment=10, method="linear"):
+        if method not in SMOOTHING_METHODS:
+            raise ValueError(f"Unknown smoothing method {method!r}, expected one of {SMOOTHING_METHODS}")
+
+        self.n = n
+        self.method = method
+
+        if n <= 2:
+            self.x = np.arange(n, dtype=float)
+            self._identity = True
+            return
+        self._identity = False
+
+        self.x = np.linspace(0, n - 1, n * samples_per_segment)
+
+        # Segment j = [j, j+1] and local coordinate t for every sample point
+        seg = np.minimum(self.x.astype(int), n - 2)
+        t = self.x - seg
+        rows = np.arange(len(self.x))
+
+        if method == "linear":
+            self._linear = np.zeros((len(self.x), n))
+            self._linear[rows, seg] = 1 - t
+            self._linear[rows, seg + 1] = t
+            return
+
+        # Cubic Hermite basis on unit-width segments
+        t2 = t * t
+        t3 = t2 * t
+        self._values = np.zeros((len(self.x), n))
+        self._values[rows, seg] = 2 * t3 - 3 * t2 + 1
+        self._values[rows, seg + 1] = -2 * t3 + 3 * t2
+        self._slopes = np.zeros((len(self.x), n))
+        self._slopes[rows, seg] = t3 - 2 * t2 + t
+        self._slopes[rows, seg + 1] = t3 - t2
+
+    def smooth(self, values):
+        values = np.asarray(values, dtype=float)
+        if self._identity:
+            return values
+        if self.method == "linear":
+            return self._linear @ values
+        return self._values @ values + self._slopes @ self.pchip_slopes(values)
+
+    @staticmethod
+    def pchip_slopes(values):
+        """
+        Fritsch-Carlson slopes for unit spacing (matches scipy's PchipInterpolator).
+        Interior: harmonic mean of the adjacent secants, 0 at local extrema / flats.
+        Ends: one-sided three-point estimate, limited to keep the shape.
+        """
+        delta = np.diff(values)
+        slopes = np.zeros(len(values))
+
+        left, right = delta[:-1], delta[1:]
+        same_sign = left * right > 0
+        slopes[1:-1][same_sign] = 2 / (1 / left[same_sign] + 1 / right[same_sign])
+
+        slopes[0] = CurveSmoother._end_slope(delta[0], delta[1])
+        slopes[-1] = CurveSmoother._end_slope(delta[-1], delta[-2])
+        return slopes
+
+    @staticmethod
+    def _end_slope(d0, d1):
+        slope = (3 * d0 - d1) / 2
+        if np.sign(slope) != np.sign(d0):
+            return 0.0
+        if np.sign(d0) != np.sign(d1) and abs(slope) > abs(3 * d0):
+            return 3 * d0
+        return slope
@@ -1,9 +1,25 @@
+import numpy as np
+
+# IS zone classification of sand by FM: zone index i applies below ZONE_EDGES[i]
+ZONE_EDGES = (2.2, 2.6, 2.9, 3.2)
+ZONE_NAMES = (
+    "Zone IV (Very Fine)",
+    "Zone III (Fine)",
+    "Zone II (Medium)",
+    "Zone I (Coarse)",
+    "Zone I (Coarse)",
+)
+
+# Materials that get a zone classification
+ZONED_MATERIALS = ("fine", "finesand")
+
+
 class FMCalculator:
 
     def calculate_fm(self, retained_list):
         if not retained_list or len(retained_list) == 0:
             return 0.0
-            
+
         cumulative = []
         running = 0
 
@@ -19,3 +35,28 @@ class FMCalculator:
 
         fm = sum(cumulative_pct) / 100
         return fm
+
+    def calculate_fm_batch(self, retained):
+        """
+        FM for every row of an (N x sieves) retained array in one pass.
+        Rows with zero total give 0.0, like calculate_fm.
+        """
+        retained = np.array(retained, dtype=float, ndmin=2)
+        if retained.shape[1] == 0:
+            return np.zeros(retained.shape[0])
+
+        cumulative = np.cumsum(retained, axis=1)
+        total = cumulative[:, -1:]
+
+        frac = np.divide(cumulative, total, out=np.ones_like(cumulative), where=total != 0)
+        fm = ((1 - frac) * 100).sum(axis=1) / 100
+        return fm
+
+    def classify_zone(self, fm_values):
+        """
+        Vectorized zone lookup: index into ZONE_NAMES for each FM value.
+        """
+        return np.searchsorted(ZONE_EDGES, fm_values, side="right")
+
+    def zone_names(self, fm_values):
+        return np.take(ZONE_NAMES, self.classify_zone(fm_values))
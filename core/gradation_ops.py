@@ -0,0 +1,821 @@
+"""
+Stateless gradation math.
+
+Every function takes what it needs - total weight, limits, locks - as explicit
+arguments and keeps no state between calls, so they are safe to call from
+several threads or worker processes at once. GradationEngine wraps them for
+code that keeps the total weight in a shared TotalWeightManager.
+
+Curves are in TABLE order (largest sieve first → Pan last) unless the name
+says graph order. Locks are given as a set of row indices or a boolean mask;
+a locked row's RETAINED weight is fixed.
+"""
+import numpy as np
+from core.material_spec import envelope_limits
+
+# Passing % by which a lock set may overshoot the envelope and still count as
+# feasible: absorbs rounding in sums like (100 - d) + d, far below any real conflict
+FEASIBILITY_TOLERANCE = 1e-9
+
+
+class LockFeasibility:
+    """
+    Result of check_lock_feasibility.
+
+    When infeasible, describes the worst conflicting span of sieves:
+      kind        "excess": the locked weights in rows need a bigger drop than the
+                  envelope allows between upper_row and lower_row;
+                  "shortfall": rows are all locked and drop less than the envelope requires
+      rows        locked rows (table order) in the span
+      upper_row   sieve whose limit bounds the top of the span (None = the 100% start)
+      lower_row   sieve whose limit bounds the bottom of the span
+      upper_limit, lower_limit
+                  the envelope passing % violated at those sieves: the maximum at
+                  upper_row and minimum at lower_row for "excess", the minimum at
+                  upper_row and maximum at lower_row for "shortfall"
+      relaxation  grams by which the locked weight in rows must be reduced
+                  ("excess") or increased ("shortfall") to clear this conflict
+    """
+
+    def __init__(self, feasible=True, kind=None, rows=(), upper_row=None, lower_row=None,
+                 upper_limit=None, lower_limit=None, relaxation=0.0):
+        self.feasible = feasible
+        self.kind = kind
+        self.rows = tuple(rows)
+        self.upper_row = upper_row
+        self.lower_row = lower_row
+        self.upper_limit = upper_limit
+        self.lower_limit = lower_limit
+        self.relaxation = relaxation
+
+    def __bool__(self):
+        return self.feasible
+
+    def describe(self, sieve_sizes):
+        """One-line explanation for the UI, naming the envelope limits in conflict."""
+        if self.feasible:
+            return "Locks are feasible"
+
+        def label(row):
+            size = sieve_sizes[row]
+            return size if isinstance(size, str) else f"{size} mm"
+
+        sieves = ", ".join(label(i) for i in self.rows)
+        excess = self.kind == "excess"
+        if self.upper_row is None:
+            top = "100% passing"
+        else:
+            top = f"{label(self.upper_row)} {'≤' if excess else '≥'} {self.upper_limit:.1f}%"
+        bottom = f"{label(self.lower_row)} {'≥' if excess else '≤'} {self.lower_limit:.1f}%"
+        if excess:
+            return (f"Locked weights on {sieves} drop more than the envelope allows "
+                    f"from {top} to {bottom}: reduce them by at least {self.relaxation:.1f} g")
+        return (f"Locked weights on {sieves} drop less than the envelope requires "
+                f"from {top} to {bottom}: increase them by at least {self.relaxation:.1f} g")
+
+
+def lock_mask(locked, n):
+    """Boolean lock mask from a set of indices or an existing mask (returned as-is)."""
+    if isinstance(locked, np.ndarray) and locked.dtype == bool:
+        return locked
+    mask = np.zeros(n, dtype=bool)
+    if locked is not None and len(locked):
+        mask[list(locked)] = True
+    return mask
+
+
+# ----------------------------------------------------
+# PASSING ↔ RETAINED
+# ----------------------------------------------------
+
+def passing_to_retained(passing, total_weight):
+    """
+    Convert % passing curve → retained weights.
+    passing is in table order (largest sieve first → Pan last).
+    """
+    if passing is None or len(passing) == 0:
+        return []
+
+    passing = np.array(passing, dtype=float)
+
+    # Convert passing to fraction
+    frac_pass = passing / 100.0
+
+    # Compute retained fraction = difference between passes
+    retained_frac = np.zeros_like(frac_pass)
+
+    # Material retained at each sieve = P(previous) - P(current)
+    retained_frac[0] = 1 - frac_pass[0]
+    for i in range(1, len(frac_pass)):
+        retained_frac[i] = frac_pass[i-1] - frac_pass[i]
+
+    retained_frac = np.clip(retained_frac, 0, None)
+
+    # Scale to total weight
+    retained_weights = retained_frac * total_weight
+
+    return retained_weights.tolist()
+
+
+def retained_to_passing(retained_weights, total_weight):
+    """
+    Convert retained weights → % passing curve.
+    This is the exact inverse of passing_to_retained.
+    retained_weights is in table order (largest sieve first → Pan last).
+    """
+    if retained_weights is None or len(retained_weights) == 0:
+        return []
+
+    retained = np.array(retained_weights, dtype=float)
+
+    if total_weight <= 0:
+        return [50.0] * len(retained)
+
+    # Convert retained weights to fractions
+    retained_frac = retained / total_weight
+    retained_frac = np.clip(retained_frac, 0, None)
+
+    # Convert retained fractions to passing fractions
+    # passing[0] = 1 - retained_frac[0]
+    # passing[i] = passing[i-1] - retained_frac[i]
+    passing_frac = np.zeros_like(retained_frac)
+    passing_frac[0] = 1 - retained_frac[0]
+
+    for i in range(1, len(retained_frac)):
+        passing_frac[i] = passing_frac[i-1] - retained_frac[i]
+
+    # Clip to valid range [0, 1] and convert to percentages
+    passing_frac = np.clip(passing_frac, 0, 1)
+    passing = passing_frac * 100
+
+    return passing.tolist()
+
+
+def passing_to_retained_batch(passing, total_weight):
+    """
+    Batched passing_to_retained.
+    passing is an (N_curves x N_sieves) array in table order.
+    Returns an ndarray of retained weights with the same shape; each row
+    matches passing_to_retained for that curve.
+    """
+    frac_pass = np.array(passing, dtype=float, ndmin=2) / 100.0
+    if frac_pass.shape[1] == 0:
+        return frac_pass
+
+    # Retained fraction = P(previous) - P(current), with P(-1) = 1
+    prev_pass = np.empty_like(frac_pass)
+    prev_pass[:, 0] = 1.0
+    prev_pass[:, 1:] = frac_pass[:, :-1]
+
+    retained_frac = np.clip(prev_pass - frac_pass, 0, None)
+
+    return retained_frac * total_weight
+
+
+def retained_to_passing_batch(retained_weights, total_weight):
+    """
+    Batched retained_to_passing.
+    retained_weights is an (N_curves x N_sieves) array in table order.
+    Returns an ndarray of % passing with the same shape; each row
+    matches retained_to_passing for that curve.
+    """
+    retained = np.array(retained_weights, dtype=float, ndmin=2)
+    if retained.shape[1] == 0:
+        return retained
+
+    if total_weight <= 0:
+        return np.full_like(retained, 50.0)
+
+    retained_frac = np.clip(retained / total_weight, 0, None)
+
+    # Running subtraction along the sieve axis: [1, r0, r1, ...] → [1, 1-r0, 1-r0-r1, ...]
+    # subtract.accumulate keeps the same left-to-right rounding as the scalar loop.
+    steps = np.empty((retained_frac.shape[0], retained_frac.shape[1] + 1))
+    steps[:, 0] = 1.0
+    steps[:, 1:] = retained_frac
+    passing_frac = np.subtract.accumulate(steps, axis=1)[:, 1:]
+
+    passing_frac = np.clip(passing_frac, 0, 1)
+    return passing_frac * 100
+
+
+# ----------------------------------------------------
+# MONOTONICITY
+# ----------------------------------------------------
+
+def enforce_monotonicity_table_order(passing, lower_limits, upper_limits, locked_rows=None):
+    """
+    Enforce monotonicity on a passing curve in TABLE order (largest→smallest sieve).
+    In table order, passing % must be NON-INCREASING (100 → 0).
+
+    Rules:
+    - Locked rows are NEVER modified
+    - Each value is clamped to [lower_limit, upper_limit]
+    - passing[i] <= passing[i-1] (non-increasing)
+    - If a locked neighbor blocks monotonicity, the unlocked side is clamped
+
+    Returns the corrected passing list.
+    """
+    passing = list(passing)
+    n = len(passing)
+    locked = lock_mask(locked_rows, n)
+    lower = list(lower_limits)
+    upper = list(upper_limits)
+
+    # First pass: clamp all unlocked values to their limits
+    for i in range(n):
+        if not locked[i]:
+            passing[i] = max(lower[i], min(upper[i], passing[i]))
+
+    # Forward pass: ensure non-increasing (top-down in table)
+    # passing[i] must be <= passing[i-1]
+    for i in range(1, n):
+        if passing[i] > passing[i-1]:
+            if not locked[i]:
+                # Clamp this value down to the previous
+                passing[i] = min(passing[i], passing[i-1])
+                passing[i] = max(lower[i], passing[i])
+            elif not locked[i-1]:
+                # This row is locked but previous isn't — raise previous
+                passing[i-1] = max(passing[i-1], passing[i])
+                passing[i-1] = min(upper[i-1], passing[i-1])
+
+    # Backward pass: ensure non-increasing (bottom-up)
+    for i in range(n-2, -1, -1):
+        if passing[i] < passing[i+1]:
+            if not locked[i]:
+                passing[i] = max(passing[i], passing[i+1])
+                passing[i] = min(upper[i], passing[i])
+            elif not locked[i+1]:
+                passing[i+1] = min(passing[i+1], passing[i])
+                passing[i+1] = max(lower[i+1], passing[i+1])
+
+    # Final clamp to limits
+    for i in range(n):
+        if not locked[i]:
+            passing[i] = max(lower[i], min(upper[i], passing[i]))
+
+    return passing
+
+
+def enforce_monotonicity_graph_order(obtained, lower, upper, locked_graph_indices=None):
+    """
+    Enforce monotonicity on obtained curve in GRAPH order (smallest→largest sieve, left→right).
+    In graph order, passing % must be NON-DECREASING (0 → 100, left → right).
+
+    locked_graph_indices: indices (or mask) in graph order that are locked.
+
+    Returns corrected numpy array.
+    """
+    obtained = np.array(obtained, dtype=float)
+    n = len(obtained)
+    locked = lock_mask(locked_graph_indices, n)
+
+    # Clamp to limits first
+    for i in range(n):
+        if not locked[i]:
+            obtained[i] = max(lower[i], min(upper[i], obtained[i]))
+
+    # Forward pass: ensure non-decreasing (left to right)
+    # obtained[i] must be >= obtained[i-1]
+    for i in range(1, n):
+        if obtained[i] < obtained[i-1]:
+            if not locked[i]:
+                obtained[i] = max(obtained[i], obtained[i-1])
+                obtained[i] = min(upper[i], obtained[i])
+            elif not locked[i-1]:
+                obtained[i-1] = min(obtained[i-1], obtained[i])
+                obtained[i-1] = max(lower[i-1], obtained[i-1])
+
+    # Backward pass: ensure non-decreasing
+    for i in range(n-2, -1, -1):
+        if obtained[i] > obtained[i+1]:
+            if not locked[i]:
+                obtained[i] = min(obtained[i], obtained[i+1])
+                obtained[i] = max(lower[i], obtained[i])
+            elif not locked[i+1]:
+                obtained[i+1] = max(obtained[i+1], obtained[i])
+                obtained[i+1] = min(upper[i+1], obtained[i+1])
+
+    # Final clamp
+    for i in range(n):
+        if not locked[i]:
+            obtained[i] = max(lower[i], min(upper[i], obtained[i]))
+
+    return obtained
+
+
+def project_monotone_table_order(passing, lower_limits, upper_limits, locked_rows=None):
+    """
+    Exact alternative to enforce_monotonicity_table_order.
+    Returns the curve closest to passing (least squares) that is NON-INCREASING,
+    inside [lower_limit, upper_limit] and keeps every locked row unchanged.
+
+    Locked rows become point bounds, the bounds are tightened so they are
+    themselves monotone, and a bounded pool-adjacent-violators pass fits the
+    curve. Everything is O(n), so one call settles the curve (no repeated
+    forward/backward passes).
+
+    If the locks cannot all be honoured (e.g. a locked row sits above a locked
+    row before it) the locked values are still kept and only those rows can
+    remain out of order.
+    Returns the corrected passing list.
+    """
+    y = np.array(passing, dtype=float)
+    n = len(y)
+    if n == 0:
+        return []
+
+    locked = lock_mask(locked_rows, n)
+    lo = np.array(lower_limits, dtype=float)
+    hi = np.array(upper_limits, dtype=float)
+    lo[locked] = y[locked]
+    hi[locked] = y[locked]
+
+    # Monotone closure of the bounds: passing[i] >= passing[j] >= lo[j] for j > i,
+    # and passing[i] <= passing[j] <= hi[j] for j < i.
+    lo = np.maximum.accumulate(lo[::-1])[::-1]
+    hi = np.minimum.accumulate(hi)
+    # Conflicting bounds: fall back to the lower side (same as compute_valid_passing_ranges)
+    hi = np.maximum(hi, lo)
+
+    result = _bounded_pool_adjacent_violators(y, lo, hi)
+    result[locked] = y[locked]
+
+    return result.tolist()
+
+
+def project_monotone_graph_order(obtained, lower, upper, locked_graph_indices=None):
+    """
+    Exact alternative to enforce_monotonicity_graph_order (NON-DECREASING, left → right).
+    See project_monotone_table_order.
+    Returns corrected numpy array.
+    """
+    n = len(obtained)
+    locked_table = lock_mask(locked_graph_indices, n)[::-1]
+    projected = project_monotone_table_order(
+        np.asarray(obtained, dtype=float)[::-1],
+        np.asarray(lower, dtype=float)[::-1],
+        np.asarray(upper, dtype=float)[::-1],
+        locked_table
+    )
+    return np.array(projected[::-1], dtype=float)
+
+
+def project_monotone_locked_retained(passing, lower_limits, upper_limits, locked_rows, retained, total_weight,
+                                     pinned_row=None):
+    """
+    Like project_monotone_table_order, but a locked row keeps its RETAINED weight
+    rather than its passing value: it moves together with the row above it, so
+    a point edited past a locked neighbour carries the neighbour along instead
+    of colliding with it. pinned_row (unlocked) is held at its passing value.
+
+    Each unlocked row heads a group with the locked rows right below it (the
+    100% start heads the group of leading locked rows), at fixed offsets from
+    the head. One value per group, shifted by the drop of the groups above it,
+    is then a bounded monotone fit weighted by group size.
+    If the locks cannot all be honoured, falls back to the lower side like
+    project_monotone_table_order, still keeping every locked retained weight.
+    Returns the corrected passing list.
+    """
+    y = np.array(passing, dtype=float)
+    n = len(y)
+    if n == 0:
+        return []
+
+    locked = lock_mask(locked_rows, n)
+    lower = np.asarray(lower_limits, dtype=float)
+    upper = np.asarray(upper_limits, dtype=float)
+
+    drop = np.zeros(n)
+    if locked.any():
+        drop[locked] = np.asarray(retained, dtype=float)[locked] / total_weight * 100.0
+    S = np.cumsum(drop)
+
+    # Group g covers rows heads[g] .. heads[g+1]-1; head -1 is the fixed 100% start
+    heads = np.flatnonzero(~locked)
+    if locked[0]:
+        heads = np.concatenate(([-1], heads))
+    ends = np.append(heads[1:], n)
+    rows = np.maximum(heads, 0)
+
+    # Row j in group g: P[j] = u[g] - S[j], with u[g] = P[head] + S[head]
+    groups = len(heads)
+    sums = np.add.reduceat(y + S, rows)
+    counts = ends - rows
+    lo = np.maximum.reduceat(lower + S, rows)
+    hi = np.minimum.reduceat(upper + S, rows)
+
+    if heads[0] == -1:
+        lo[0] = hi[0] = 100.0  # The start is fixed at 100% passing
+    if pinned_row is not None and not locked[pinned_row]:
+        g = np.searchsorted(heads, pinned_row)
+        lo[g] = hi[g] = y[pinned_row] + S[pinned_row]
+
+    # Monotone closure of the bounds, conflicting bounds fall back to the lower side
+    lo = np.maximum.accumulate(lo[::-1])[::-1]
+    hi = np.minimum.accumulate(hi)
+    hi = np.maximum(hi, lo)
+
+    u = _bounded_pool_adjacent_violators(sums / counts, lo, hi, weights=counts)
+    group_of_row = np.repeat(np.arange(groups), counts)
+    return (u[group_of_row] - S).tolist()
+
+
+def _bounded_pool_adjacent_violators(values, lo, hi, weights=None):
+    """
+    Least-squares NON-INCREASING fit of values with lo[i] <= fit[i] <= hi[i], in O(n).
+    lo and hi must already be non-increasing with lo <= hi.
+    weights (default all 1) count each value that many times.
+    """
+    # Each block is [sum, count, lo, hi]; its fitted value is the block mean
+    # clipped to the tightest bounds inside the block.
+    def block_value(block):
+        return min(block[3], max(block[2], block[0] / block[1]))
+
+    if weights is None:
+        weights = np.ones(len(values), dtype=int)
+
+    blocks = []
+    for v, w, l, h in zip(values, weights, lo, hi):
+        blocks.append([v * w, w, l, h, 1])
+        while len(blocks) > 1 and block_value(blocks[-2]) < block_value(blocks[-1]):
+            total, count, _, block_hi, size = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += count
+            blocks[-1][3] = block_hi
+            blocks[-1][4] += size
+
+    fit = np.empty(len(values))
+    pos = 0
+    for block in blocks:
+        fit[pos:pos + block[4]] = block_value(block)
+        pos += block[4]
+    return fit
+
+
+def enforce_monotonicity_batch(curves, lower_limits, upper_limits, locked_mask=None, order="table"):
+    """
+    Batched enforce_monotonicity_table_order / enforce_monotonicity_graph_order.
+    curves is an (N_curves x N_sieves) array in the given order ("table" or "graph"),
+    lower_limits / upper_limits are per-sieve in the same order.
+    locked_mask is a boolean array, either shared (N_sieves,) or per curve
+    (N_curves x N_sieves); True marks a locked value.
+
+    The passes run sieve by sieve but act on every curve at once, so each row
+    matches the corresponding scalar function exactly.
+    Returns the corrected ndarray.
+    """
+    if order not in ("table", "graph"):
+        raise ValueError(f"Unknown order: {order!r}")
+
+    P = np.array(curves, dtype=float, ndmin=2)
+    lower = np.asarray(lower_limits, dtype=float)
+    upper = np.asarray(upper_limits, dtype=float)
+    n = P.shape[1]
+
+    if locked_mask is None:
+        locked = np.zeros(P.shape, dtype=bool)
+    else:
+        locked = np.broadcast_to(np.asarray(locked_mask, dtype=bool), P.shape)
+
+    # Graph order is table order reversed; its forward pass is the table backward
+    # pass, so flip the columns and run the table passes in swapped order.
+    if order == "graph":
+        P = P[:, ::-1].copy()
+        lower = lower[::-1]
+        upper = upper[::-1]
+        locked = locked[:, ::-1]
+
+    free = ~locked
+
+    def clamp_free():
+        np.copyto(P, np.maximum(lower, np.minimum(upper, P)), where=free)
+
+    def forward_pass():
+        # passing[i] must be <= passing[i-1]
+        for i in range(1, n):
+            bad = P[:, i] > P[:, i-1]
+            lower_this = bad & free[:, i]
+            raise_prev = bad & locked[:, i] & free[:, i-1]
+
+            P[lower_this, i] = np.maximum(lower[i], np.minimum(P[lower_this, i], P[lower_this, i-1]))
+            P[raise_prev, i-1] = np.minimum(upper[i-1], np.maximum(P[raise_prev, i-1], P[raise_prev, i]))
+
+    def backward_pass():
+        for i in range(n-2, -1, -1):
+            bad = P[:, i] < P[:, i+1]
+            raise_this = bad & free[:, i]
+            lower_next = bad & locked[:, i] & free[:, i+1]
+
+            P[raise_this, i] = np.minimum(upper[i], np.maximum(P[raise_this, i], P[raise_this, i+1]))
+            P[lower_next, i+1] = np.maximum(lower[i+1], np.minimum(P[lower_next, i+1], P[lower_next, i]))
+
+    clamp_free()
+    if order == "table":
+        forward_pass()
+        backward_pass()
+    else:
+        backward_pass()
+        forward_pass()
+    clamp_free()
+
+    if order == "graph":
+        P = P[:, ::-1].copy()
+
+    return P
+
+
+# ----------------------------------------------------
+# FEASIBLE RANGES WITH LOCKS
+# ----------------------------------------------------
+
+def compute_valid_passing_ranges(retained, locked_rows, lower_limits, upper_limits, total_weight,
+                                 ignore_row=None, envelope=None):
+    """
+    Calculates the absolute valid [min, max] passing % for each sieve using forward/backward sweep.
+    Ensures strict envelope compliance (margin = 0.1) and honors all locks (except ignore_row).
+    envelope: optional precomputed (env_lower, env_upper), e.g. MaterialSpec.envelope.
+    Returns arrays P_min, P_max of length n.
+    """
+    n = len(lower_limits)
+
+    # Strict limits with 0.1 margin, unless lower == upper (e.g. 100)
+    if envelope is None:
+        envelope = envelope_limits(lower_limits, upper_limits)
+    env_lower, env_upper = envelope
+
+    P_min = np.zeros(n)
+    P_max = np.zeros(n)
+
+    active_locks = lock_mask(locked_rows, n).copy()
+    if ignore_row is not None:
+        active_locks[ignore_row] = False
+
+    # Forward Sweep
+    prev_min = 100.0
+    prev_max = 100.0
+
+    for i in range(n):
+        if active_locks[i]:
+            d = retained[i] / total_weight * 100.0
+            cur_min = prev_min - d
+            cur_max = prev_max - d
+        else:
+            cur_min = 0.0
+            cur_max = prev_max
+
+        cur_min = max(cur_min, env_lower[i])
+        cur_max = min(cur_max, env_upper[i])
+
+        # Prevent impossible states from crashing math (fallback to envelope)
+        if cur_min > cur_max:
+            cur_max = cur_min
+
+        P_min[i] = cur_min
+        P_max[i] = cur_max
+        prev_min = cur_min
+        prev_max = cur_max
+
+    # Backward Sweep
+    # Pan passing must be exactly 0
+    P_min[n-1] = max(P_min[n-1], 0.0)
+    P_max[n-1] = min(P_max[n-1], 0.0)
+
+    for i in range(n-2, -1, -1):
+        next_min = P_min[i+1]
+        next_max = P_max[i+1]
+
+        if active_locks[i+1]:
+            d = retained[i+1] / total_weight * 100.0
+            cur_min = next_min + d
+            cur_max = next_max + d
+        else:
+            cur_min = next_min
+            cur_max = 100.0
+
+        P_min[i] = max(P_min[i], cur_min)
+        P_max[i] = min(P_max[i], cur_max)
+
+        if P_min[i] > P_max[i]:
+            P_max[i] = P_min[i]
+
+    return P_min, P_max
+
+
+def check_lock_feasibility(retained, locked_rows, lower_limits, upper_limits, total_weight, envelope=None):
+    """
+    Linear-time check that some monotonic curve fits the (margin) envelope while
+    every locked row keeps its retained weight - the condition under which
+    compute_valid_passing_ranges needs no min > max fallback.
+
+    Positions run from the fixed 100% start (p = 0) to Pan (p = n), with S[p]
+    the locked drop (%) accumulated so far. Along the chain the system is
+    infeasible exactly when, for some span a < b:
+      excess:    S[b] - S[a] > hi[a] - lo[b]      (locked drop exceeds what fits)
+      shortfall: S[b] - S[a] < lo[a] - hi[b]      (span fully locked, too little drop)
+    The worst of each is a running min / max over a, so one pass suffices.
+    Conflicts within FEASIBILITY_TOLERANCE are rounding noise, not reported.
+    Returns a LockFeasibility describing the worst conflict.
+    """
+    n = len(lower_limits)
+    if n == 0:
+        return LockFeasibility()
+
+    if envelope is None:
+        envelope = envelope_limits(lower_limits, upper_limits)
+    locked = lock_mask(locked_rows, n)
+
+    lo = np.concatenate(([100.0], envelope[0]))
+    hi = np.concatenate(([100.0], envelope[1]))
+    # Pan passing must be exactly 0
+    lo[n] = max(lo[n], 0.0)
+    hi[n] = min(hi[n], 0.0)
+
+    drop = np.zeros(n + 1)
+    if locked.any():
+        retained = np.asarray(retained, dtype=float)
+        drop[1:][locked] = retained[locked] / total_weight * 100.0
+    S = np.cumsum(drop)
+
+    worst = FEASIBILITY_TOLERANCE
+    conflict = None
+
+    best_top = np.inf       # min over a <= b of S[a] + hi[a]
+    best_top_at = 0
+    run_top = -np.inf       # max over a in the current locked run of S[a] + lo[a]
+    run_top_at = 0
+    for b in range(n + 1):
+        if b > 0 and not locked[b-1]:
+            run_top = -np.inf  # An unlocked row lets the span drop as much as needed
+
+        if S[b] + hi[b] < best_top:
+            best_top, best_top_at = S[b] + hi[b], b
+        excess = S[b] + lo[b] - best_top
+        if excess > worst:
+            worst, conflict = excess, ("excess", best_top_at, b)
+
+        shortfall = run_top - (S[b] + hi[b])
+        if shortfall > worst:
+            worst, conflict = shortfall, ("shortfall", run_top_at, b)
+
+        if S[b] + lo[b] > run_top:
+            run_top, run_top_at = S[b] + lo[b], b
+
+    if conflict is None:
+        return LockFeasibility()
+
+    kind, a, b = conflict
+    if kind == "excess":
+        upper_limit, lower_limit = hi[a], lo[b]
+    else:
+        upper_limit, lower_limit = lo[a], hi[b]
+    # Positions → table rows: position p is row p-1; the span's rows are a..b-1
+    rows = [i for i in range(a, b) if locked[i]]
+    return LockFeasibility(
+        feasible=False, kind=kind, rows=rows,
+        upper_row=a - 1 if a > 0 else None, lower_row=b - 1,
+        upper_limit=float(upper_limit), lower_limit=float(lower_limit),
+        relaxation=worst * total_weight / 100.0
+    )
+
+
+def compute_valid_retained_range(row_index, retained, locked_rows, lower_limits, upper_limits, total_weight,
+                                 envelope=None):
+    """
+    Calculates the [min, max] allowed retained weight for row_index that strictly obeys
+    envelope limits and all OTHER locks.
+    """
+    # Run sweep ignoring the current row's lock (since we want to edit it)
+    P_min, P_max = compute_valid_passing_ranges(
+        retained, locked_rows, lower_limits, upper_limits, total_weight,
+        ignore_row=row_index, envelope=envelope
+    )
+
+    # P[row_index] = P[row_index-1] - (retained[row_index]/total * 100)
+    # So delta = P[row_index-1] - P[row_index]
+    prev_max = 100.0 if row_index == 0 else P_max[row_index-1]
+    prev_min = 100.0 if row_index == 0 else P_min[row_index-1]
+
+    cur_min = P_min[row_index]
+    cur_max = P_max[row_index]
+
+    max_delta = prev_max - cur_min
+    min_delta = prev_min - cur_max
+
+    min_delta = max(0.0, min_delta)
+    max_delta = max(0.0, max_delta)
+
+    return (min_delta * total_weight / 100.0), (max_delta * total_weight / 100.0)
+
+
+def compute_max_retained(row_index, retained, locked_rows, total_weight):
+    """
+    Compute the maximum retained weight that can be assigned to row_index
+    without making any unlocked row go below 0.
+
+    This is used to auto-clamp when a user enters a huge value like 99999.
+    """
+    locked = lock_mask(locked_rows, len(retained))
+
+    # Sum of locked rows (excluding the one being edited)
+    locked_total = sum(retained[j] for j in np.flatnonzero(locked) if j != row_index)
+
+    # Maximum this row can have = total - locked_total
+    # (other unlocked rows can go to 0)
+    max_val = total_weight - locked_total
+
+    return max(0, max_val)
+
+
+# ----------------------------------------------------
+# EDITS WITH LOCKS
+# ----------------------------------------------------
+
+def adjust_retained_with_locks(retained, edited_index, new_value, locked_rows, total_weight):
+    """
+    Set retained[edited_index] = new_value, then redistribute among unlocked rows
+    so that total retained == total_weight. Locked rows are NEVER modified.
+    """
+    retained = list(retained)
+    n = len(retained)
+    locked = lock_mask(locked_rows, n)
+
+    # Clamp new_value to valid range
+    locked_total = sum(retained[j] for j in np.flatnonzero(locked) if j != edited_index)
+    max_val = total_weight - locked_total
+    new_value = max(0, min(new_value, max_val))
+
+    retained[edited_index] = new_value
+
+    adjustable = [j for j in range(n) if j != edited_index and not locked[j]]
+
+    if not adjustable:
+        return retained
+
+    remaining = total_weight - new_value - locked_total
+    remaining = max(0, remaining)
+
+    adjustable_total = sum(retained[j] for j in adjustable)
+
+    if adjustable_total > 0 and remaining >= 0:
+        scale = remaining / adjustable_total
+        for j in adjustable:
+            retained[j] = max(0, retained[j] * scale)
+    elif remaining > 0:
+        per_sieve = remaining / len(adjustable)
+        for j in adjustable:
+            retained[j] = per_sieve
+
+    return retained
+
+
+def sync_passing_with_locks(proposed_passing, old_retained, locked_rows, lower_limits, upper_limits, total_weight):
+    """
+    When 'passing' is edited (via table or graph), convert it to a valid retained array
+    that STRICTLY respects locked_rows (where locked_rows locks the RETAINED weight).
+    Then convert back to a finalized passing array.
+    Returns (final_passing, retained).
+    """
+    # 1. Compute proposed retained from the proposed passing
+    proposed_retained = passing_to_retained(proposed_passing, total_weight)
+
+    n = len(proposed_retained)
+    locked = lock_mask(locked_rows, n)
+    locked_indices = np.flatnonzero(locked)
+
+    # 2. Force locked rows to keep their old retained values
+    for i in locked_indices:
+        proposed_retained[i] = old_retained[i]
+
+    # 3. Distribute any mismatch to unlocked rows
+    locked_total = sum(proposed_retained[j] for j in locked_indices)
+    unlocked_indices = [j for j in range(n) if not locked[j]]
+
+    if unlocked_indices:
+        remaining = total_weight - locked_total
+        remaining = max(0, remaining)
+
+        unlocked_total = sum(proposed_retained[j] for j in unlocked_indices)
+
+        if unlocked_total > 0 and remaining >= 0:
+            scale = remaining / unlocked_total
+            for j in unlocked_indices:
+                proposed_retained[j] = max(0, proposed_retained[j] * scale)
+        elif remaining > 0:
+            per_sieve = remaining / len(unlocked_indices)
+            for j in unlocked_indices:
+                proposed_retained[j] = per_sieve
+
+    # 4. Re-derive passing from this strictly valid retained array
+    final_passing = retained_to_passing(proposed_retained, total_weight)
+
+    # 5. Enforce limits on unlocked rows
+    for i in unlocked_indices:
+        final_passing[i] = max(lower_limits[i], min(upper_limits[i], final_passing[i]))
+
+    # 6. Clamping passing changes the retained of the row below, so a locked row
+    # can end up outside its limits here. Keeping the locked retained matters more,
+    # so the un-clamped passing is returned; lock combinations that cannot fit are
+    # rejected up front via check_lock_feasibility.
+    return final_passing, proposed_retained
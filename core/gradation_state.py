@@ -0,0 +1,196 @@
+import numpy as np
+from core.gradation_engine import GradationEngine
+from core.material_spec import get_spec
+from core.passing_bounds import PassingBounds
+
+# Change flags carried by notifications
+MATERIAL = "material"
+PASSING = "passing"
+RETAINED = "retained"
+LOCKS = "locks"
+WEIGHT = "weight"  # Total weight; retained was rescaled by one common factor (FM unchanged)
+
+ALL_FLAGS = frozenset((MATERIAL, PASSING, RETAINED, LOCKS, WEIGHT))
+
+
+class GradationState:
+    """
+    Single observable model of the curve being edited, shared by all panels.
+
+    Holds the material spec, the passing curve (table order ndarray), the retained
+    weights and the boolean lock mask. Edits mark flags dirty; subscribers are
+    notified once per flush with the set of flags that changed, however many
+    edits happened before it.
+
+    scheduler(callback) defers the flush, e.g. a Tk widget's after_idle, so all
+    changes made in one event reach each view as a single notification.
+    Without a scheduler, notifications are delivered immediately.
+    """
+
+    def __init__(self, grad_engine=None, scheduler=None):
+        self.grad_engine = grad_engine or GradationEngine()
+        self.total_weight_manager = self.grad_engine.total_weight_manager
+        self.scheduler = scheduler
+
+        self.material_key = None
+        self.spec = None
+        self.passing = np.zeros(0)  # Table order; views write in place
+        self.retained = []
+        self.locked_mask = np.zeros(0, dtype=bool)  # True = row's retained weight is locked
+
+        # material_key -> (passing, retained, locked_mask, total_weight) of materials switched away from
+        self._sessions = {}
+        self._bounds = {}  # material_key -> PassingBounds, kept in step incrementally
+
+        self._subscribers = []
+        self._dirty = {}  # flag -> set of sources that changed it
+        self._flush_pending = False
+
+    # ----------------------------------------------------
+    # SUBSCRIPTIONS
+    # ----------------------------------------------------
+
+    def subscribe(self, callback, flags=ALL_FLAGS, owner=None):
+        """
+        Call callback(changed_flags) after a flush that touched any of flags.
+        Changes marked with source=owner are not reported back to that subscriber,
+        so a view that already drew its own edit is not redrawn.
+        """
+        self._subscribers.append((callback, frozenset(flags), owner))
+
+    def mark_dirty(self, *flags, source=None):
+        for flag in flags:
+            self._dirty.setdefault(flag, set()).add(source)
+
+        if self._flush_pending:
+            return
+        self._flush_pending = True
+        if self.scheduler is None:
+            self.flush()
+        else:
+            self.scheduler(self.flush)
+
+    def flush(self):
+        """Deliver pending changes: one call per interested subscriber."""
+        self._flush_pending = False
+        dirty, self._dirty = self._dirty, {}
+        if not dirty:
+            return
+
+        for callback, flags, owner in self._subscribers:
+            changed = {
+                flag for flag in flags
+                if flag in dirty and (owner is None or dirty[flag] - {owner})
+            }
+            if changed:
+                callback(changed)
+
+    # ----------------------------------------------------
+    # EDITS
+    # ----------------------------------------------------
+
+    @property
+    def locked_rows(self):
+        """Locked row indices (table order) as a set, for the engine APIs."""
+        return set(np.flatnonzero(self.locked_mask).tolist())
+
+    def load_material(self, material_key):
+        """
+        Switch material. The current material's curve, locks and total weight are
+        kept in memory, and a material already edited in this session gets its
+        own back as-is, without re-running the engine. New materials start from
+        defaults (see reset_material).
+        """
+        if material_key == self.material_key:
+            return
+
+        if self.material_key is not None:
+            # The arrays are handed over, not copied: the state gets new ones below
+            self._sessions[self.material_key] = (
+                self.passing, self.retained, self.locked_mask,
+                self.total_weight_manager.get_total_weight()
+            )
+
+        session = self._sessions.pop(material_key, None)
+        if session is None:
+            self.reset_material(material_key)
+            return
+
+        self.material_key = material_key
+        self.spec = get_spec(material_key)
+        self.passing, self.retained, self.locked_mask, weight = session
+        self.total_weight_manager.set_total_weight(weight)
+
+        self.mark_dirty(MATERIAL, PASSING, RETAINED, LOCKS, WEIGHT)
+
+    def reset_material(self, material_key):
+        """
+        Load material_key from defaults: default weight, mid-envelope curve, no locks.
+        Any session kept for it is discarded.
+        """
+        self._sessions.pop(material_key, None)
+        self.material_key = material_key
+        self.spec = get_spec(material_key)
+        self.total_weight_manager.set_total_weight(self.spec.default_weight)
+
+        # Initialize passing with middle values between limits, kept monotonic
+        midpoint = (self.spec.lower + self.spec.upper) / 2
+        self.passing = np.array(self.grad_engine.enforce_monotonicity_table_order(
+            midpoint, self.spec.lower, self.spec.upper
+        ), dtype=float)
+        self.retained = self.grad_engine.passing_to_retained(self.passing)
+        self.locked_mask = np.zeros(self.spec.n, dtype=bool)
+
+        self.mark_dirty(MATERIAL, PASSING, RETAINED, LOCKS, WEIGHT)
+
+    def set_curve(self, passing, retained, source=None):
+        """Replace passing (copied into the shared buffer) and retained."""
+        if passing is not self.passing:
+            self.passing[:] = passing
+        self.retained = list(retained)
+        self.mark_dirty(PASSING, RETAINED, source=source)
+
+    def set_total_weight(self, weight, source=None):
+        """
+        New total weight. The passing curve is unchanged, so retained only needs
+        rescaling by new / old weight (what passing_to_retained would give).
+        """
+        old_weight = self.total_weight_manager.get_total_weight()
+        if weight == old_weight:
+            return
+        self.total_weight_manager.set_total_weight(weight)
+
+        if old_weight > 0 and len(self.retained) == len(self.passing):
+            factor = weight / old_weight
+            self.retained = [r * factor for r in self.retained]
+            # Pure rescale: FM is scale-invariant, so only WEIGHT is reported
+            self.mark_dirty(WEIGHT, source=source)
+        else:
+            self.retained = self.grad_engine.passing_to_retained(self.passing)
+            self.mark_dirty(WEIGHT, RETAINED, source=source)
+
+    def passing_bounds(self):
+        """
+        Feasibility bounds for the current locks, locked weights and total weight.
+        The per-material cache is brought up to date incrementally on each call.
+        """
+        bounds = self._bounds.get(self.material_key)
+        if bounds is None:
+            bounds = self._bounds[self.material_key] = PassingBounds(
+                self.spec.lower, self.spec.upper, envelope=self.spec.envelope
+            )
+        bounds.update(self.locked_mask, self.retained, self.total_weight_manager.get_total_weight())
+        return bounds
+
+    def check_locks(self, locked_mask):
+        """
+        LockFeasibility of locked_mask with the current retained weights and total
+        weight, e.g. before applying a lock toggle. Nothing is changed.
+        """
+        return self.grad_engine.check_lock_feasibility(
+            self.retained, locked_mask, self.spec.lower, self.spec.upper, envelope=self.spec.envelope
+        )
+
+    def toggle_lock(self, row_index, source=None):
+        self.locked_mask[row_index] = not self.locked_mask[row_index]
+        self.mark_dirty(LOCKS, source=source)
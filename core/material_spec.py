@@ -0,0 +1,94 @@
+import numpy as np
+from config.materials import materials
+
+# Strict envelope margin kept inside limits that are not fixed (lower < upper)
+ENVELOPE_MARGIN = 0.1
+
+
+def envelope_limits(lower, upper, margin=ENVELOPE_MARGIN):
+    """
+    Margin-adjusted limits: [lower + margin, upper - margin], unless lower == upper (e.g. 100).
+    Returns (env_lower, env_upper) arrays.
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    open_range = lower < upper
+    return (
+        np.where(open_range, lower + margin, lower),
+        np.where(open_range, upper - margin, upper),
+    )
+
+
+def _read_only(values, dtype=float):
+    array = np.array(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+class MaterialSpec:
+    """
+    Immutable, precomputed view of one material from config/materials.py.
+
+    Arrays are read-only and in TABLE order (largest sieve → Pan); the *_graph
+    attributes are reversed views of the same data (smallest → largest, left → right).
+    Build with get_spec() so every module shares one instance per material.
+    """
+
+    __slots__ = (
+        "key", "n", "default_weight",
+        "sieve_sizes", "sieve_labels_graph",
+        "lower", "upper", "lower_graph", "upper_graph",
+        "env_lower", "env_upper", "envelope",
+        "pan_mask", "fixed_mask",
+        "sieve_range", "sieve_column", "weight_column", "passing_column",
+        "lower_column", "upper_column", "total_weight_cell",
+    )
+
+    def __init__(self, key, data):
+        sieve_sizes = tuple(data["sieve_sizes"])
+        lower = _read_only(data["lower_limits"])
+        upper = _read_only(data["upper_limits"])
+        env_lower, env_upper = envelope_limits(lower, upper)
+        env_lower.setflags(write=False)
+        env_upper.setflags(write=False)
+
+        values = {
+            "key": key,
+            "n": len(sieve_sizes),
+            "default_weight": data.get("default_weight", 5000),
+            "sieve_sizes": sieve_sizes,
+            "sieve_labels_graph": sieve_sizes[::-1],
+            "lower": lower,
+            "upper": upper,
+            "lower_graph": lower[::-1],
+            "upper_graph": upper[::-1],
+            "env_lower": env_lower,
+            "env_upper": env_upper,
+            "envelope": (env_lower, env_upper),
+            "pan_mask": _read_only([s == "Pan" for s in sieve_sizes], dtype=bool),
+            "fixed_mask": _read_only(lower == upper, dtype=bool),
+        }
+        # Excel sheet layout
+        for name in ("sieve_range", "sieve_column", "weight_column", "passing_column",
+                     "lower_column", "upper_column", "total_weight_cell"):
+            values[name] = data.get(name)
+
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"MaterialSpec is immutable (cannot set {name!r})")
+
+    def __repr__(self):
+        return f"MaterialSpec({self.key!r}, n={self.n})"
+
+
+_specs = {}
+
+
+def get_spec(material_key):
+    """Shared compiled MaterialSpec for material_key (built on first use)."""
+    spec = _specs.get(material_key)
+    if spec is None:
+        spec = _specs[material_key] = MaterialSpec(material_key, materials[material_key])
+    return spec
@@ -0,0 +1,292 @@
+import numpy as np
+from core.gradation_ops import FEASIBILITY_TOLERANCE
+from core.material_spec import envelope_limits
+
+
+class PassingBounds:
+    """
+    Cached feasibility bounds (P_min / P_max per sieve, table order) for one
+    material's limits, lock set, locked retained weights and total weight.
+
+    Gives the same result as GradationEngine.compute_valid_passing_ranges, but
+    keeps the forward sweep and final bounds. When one lock is toggled, or one
+    locked weight changes, update() re-sweeps from that row and stops as soon as
+    the sweep reaches a row whose cached values are unchanged, which usually
+    means the next lock or envelope limit. When more than FULL_SWEEP_FRACTION
+    of the rows changed at once (e.g. a total weight change with many locks,
+    which changes every locked drop), one full sweep is done instead.
+
+        bounds = PassingBounds(spec.lower, spec.upper, envelope=spec.envelope)
+        bounds.update(locked_mask, retained, total_weight)
+        P_min, P_max = bounds.ranges()
+    """
+
+    # More changed rows than this fraction of n: one full sweep is cheaper
+    FULL_SWEEP_FRACTION = 0.25
+
+    def __init__(self, lower_limits, upper_limits, envelope=None):
+        self.n = len(lower_limits)
+        if envelope is None:
+            envelope = envelope_limits(lower_limits, upper_limits)
+        self.env_lower = np.asarray(envelope[0], dtype=float)
+        self.env_upper = np.asarray(envelope[1], dtype=float)
+
+        self.total_weight = None
+        self.locked = np.zeros(self.n, dtype=bool)
+        self.drop = np.zeros(self.n)  # Passing % drop across each locked row (0 if unlocked)
+
+        # Forward-sweep bounds, and final bounds after the backward sweep
+        self._F_min = np.zeros(self.n)
+        self._F_max = np.zeros(self.n)
+        self.P_min = np.zeros(self.n)
+        self.P_max = np.zeros(self.n)
+        # Rows where a sweep found min > max beyond rounding noise and fell back
+        # (only when the locks are infeasible)
+        self._F_fixed = np.zeros(self.n, dtype=bool)
+        self._P_fixed = np.zeros(self.n, dtype=bool)
+        self._full_sweep()
+
+    # ----------------------------------------------------
+    # PUBLIC API
+    # ----------------------------------------------------
+
+    def update(self, locked_rows, retained, total_weight):
+        """
+        Bring the cache in line with the given locks (set or boolean mask),
+        retained weights and total weight. Returns the number of rows that changed.
+        """
+        locked = np.zeros(self.n, dtype=bool)
+        if isinstance(locked_rows, np.ndarray) and locked_rows.dtype == bool:
+            locked[:] = locked_rows
+        else:
+            locked[list(locked_rows)] = True
+
+        drop = np.zeros(self.n)
+        if locked.any():
+            retained = np.asarray(retained, dtype=float)
+            drop[locked] = retained[locked] / total_weight * 100.0
+
+        changed = np.flatnonzero((locked != self.locked) | (drop != self.drop))
+        self.total_weight = total_weight
+        if len(changed) == 0:
+            return 0
+
+        self.locked = locked
+        self.drop = drop
+        if len(changed) > max(1, self.FULL_SWEEP_FRACTION * self.n):
+            self._full_sweep()
+        else:
+            for row in changed:
+                self._update_row(row)
+        return len(changed)
+
+    def ranges(self, ignore_row=None):
+        """
+        (P_min, P_max) copies. With ignore_row, that row's lock is left out,
+        like compute_valid_passing_ranges(ignore_row=...).
+        """
+        if ignore_row is None or not self.locked[ignore_row]:
+            return self.P_min.copy(), self.P_max.copy()
+
+        unlocked = self._copy()
+        unlocked.locked[ignore_row] = False
+        unlocked.drop[ignore_row] = 0.0
+        unlocked._update_row(ignore_row)
+        return unlocked.P_min, unlocked.P_max
+
+    @property
+    def feasible(self):
+        """True if some curve satisfies the envelope and every lock."""
+        if self.n == 0:
+            return True
+        return not (self._F_fixed.any() or self._P_fixed.any()
+                    or self.P_min[-1] > self.P_max[-1] + FEASIBILITY_TOLERANCE)
+
+    def retained_ranges(self):
+        """
+        [min, max] retained weight for every row at once, each within the envelope
+        and all OTHER locks: arrays equal to retained_range(row) for every row.
+
+        Unlocked rows read the cached bounds directly. A locked row r, once
+        released, only changes the sweep inside the run of locks that follows it,
+        rows r..t. There the bounds reduce to prefix sums of the locked drops
+        (S) and a suffix max / min over the run:
+            P_min[r] = max(max_k (L_k + S_k), tail_min) - S_r
+            P_max[r] = min(F_max[r-1] + S_r, min_k (U_k + S_k), tail_max) - S_r
+        so every row costs O(1) after one O(n) pass. If the locks are infeasible,
+        the sweep's min > max fallbacks break these formulas, and the locked rows
+        use ranges(ignore_row) instead.
+        """
+        n = self.n
+        P_min, P_max = self.P_min, self.P_max
+        prev_min = np.concatenate(([100.0], P_min[:-1]))
+        prev_max = np.concatenate(([100.0], P_max[:-1]))
+        cur_min = P_min.copy()
+        cur_max = P_max.copy()
+
+        locked_rows = np.flatnonzero(self.locked)
+        if len(locked_rows) and not self.feasible:
+            for r in locked_rows:
+                relaxed_min, relaxed_max = self.ranges(ignore_row=r)
+                if r > 0:
+                    prev_min[r] = relaxed_min[r-1]
+                    prev_max[r] = relaxed_max[r-1]
+                cur_min[r] = relaxed_min[r]
+                cur_max[r] = relaxed_max[r]
+        elif len(locked_rows):
+            S = np.cumsum(self.drop)
+            low = self.env_lower + S
+            high = self.env_upper + S
+
+            # Suffix max / min over the run of locks after each row, and where it ends
+            run_low = low.copy()
+            run_high = high.copy()
+            run_end = np.arange(n)
+            for k in range(n - 2, -1, -1):
+                if self.locked[k+1]:
+                    run_low[k] = max(low[k], run_low[k+1])
+                    run_high[k] = min(high[k], run_high[k+1])
+                    run_end[k] = run_end[k+1]
+
+            for r in locked_rows:
+                t = run_end[r]
+                if t == n - 1:
+                    tail_min = tail_max = S[t]  # Pan passing is exactly 0
+                else:
+                    tail_min = P_min[t+1] + S[t]  # Row t+1 is unlocked: P[t] >= P[t+1]
+                    tail_max = 100.0 + S[t]
+                entering = 100.0 if r == 0 else self._F_max[r-1]
+
+                cur_min[r] = max(max(self.env_lower[r], 0.0) + S[r], run_low[r], tail_min) - S[r]
+                cur_max[r] = min(entering + S[r], run_high[r], tail_max) - S[r]
+                if r > 0:
+                    # Row r no longer pins row r-1 to it: only P[r-1] >= P[r] remains
+                    prev_min[r] = max(self._F_min[r-1], cur_min[r])
+                    prev_max[r] = min(self._F_max[r-1], 100.0)
+
+        scale = self.total_weight / 100.0
+        min_delta = np.maximum(0.0, prev_min - cur_max)
+        max_delta = np.maximum(0.0, prev_max - cur_min)
+        return min_delta * scale, max_delta * scale
+
+    def retained_range(self, row_index):
+        """
+        [min, max] retained weight for row_index within the envelope and all OTHER
+        locks, like GradationEngine.compute_valid_retained_range.
+        """
+        P_min, P_max = self.ranges(ignore_row=row_index)
+
+        prev_max = 100.0 if row_index == 0 else P_max[row_index-1]
+        prev_min = 100.0 if row_index == 0 else P_min[row_index-1]
+
+        max_delta = max(0.0, prev_max - P_min[row_index])
+        min_delta = max(0.0, prev_min - P_max[row_index])
+
+        return (min_delta * self.total_weight / 100.0), (max_delta * self.total_weight / 100.0)
+
+    # ----------------------------------------------------
+    # SWEEPS
+    # ----------------------------------------------------
+
+    def _forward_step(self, i, prev_min, prev_max):
+        if self.locked[i]:
+            cur_min = prev_min - self.drop[i]
+            cur_max = prev_max - self.drop[i]
+        else:
+            cur_min = 0.0
+            cur_max = prev_max
+
+        cur_min = max(cur_min, self.env_lower[i])
+        cur_max = min(cur_max, self.env_upper[i])
+
+        # Prevent impossible states from crashing math (fallback to envelope).
+        # A gap within FEASIBILITY_TOLERANCE is rounding, e.g. (100 - d) + d > 100.
+        fixed = cur_min > cur_max + FEASIBILITY_TOLERANCE
+        if cur_min > cur_max:
+            cur_max = cur_min
+        return cur_min, cur_max, fixed
+
+    def _backward_step(self, i):
+        next_min = self.P_min[i+1]
+        next_max = self.P_max[i+1]
+
+        if self.locked[i+1]:
+            cur_min = next_min + self.drop[i+1]
+            cur_max = next_max + self.drop[i+1]
+        else:
+            cur_min = next_min
+            cur_max = 100.0
+
+        cur_min = max(self._F_min[i], cur_min)
+        cur_max = min(self._F_max[i], cur_max)
+        fixed = cur_min > cur_max + FEASIBILITY_TOLERANCE
+        if cur_min > cur_max:
+            cur_max = cur_min
+        return cur_min, cur_max, fixed
+
+    def _pan_bounds(self):
+        # Pan passing must be exactly 0
+        last = self.n - 1
+        return max(self._F_min[last], 0.0), min(self._F_max[last], 0.0)
+
+    def _full_sweep(self):
+        n = self.n
+        if n == 0:
+            return
+
+        prev_min = prev_max = 100.0
+        for i in range(n):
+            prev_min, prev_max, self._F_fixed[i] = self._forward_step(i, prev_min, prev_max)
+            self._F_min[i] = prev_min
+            self._F_max[i] = prev_max
+
+        self.P_min[n-1], self.P_max[n-1] = self._pan_bounds()
+        for i in range(n-2, -1, -1):
+            self.P_min[i], self.P_max[i], self._P_fixed[i] = self._backward_step(i)
+
+    def _update_row(self, k):
+        """
+        Re-sweep after row k's lock or locked weight changed.
+
+        Forward: restart at k and stop at the first row whose sweep state is
+        unchanged, since every later row depends only on that state.
+        Backward: rows k-1 .. last forward change must be redone. Below k-1,
+        stop at the first row whose bounds come out unchanged.
+        """
+        n = self.n
+        prev_min, prev_max = (100.0, 100.0) if k == 0 else (self._F_min[k-1], self._F_max[k-1])
+        last = k - 1
+        for i in range(k, n):
+            cur_min, cur_max, fixed = self._forward_step(i, prev_min, prev_max)
+            if cur_min == self._F_min[i] and cur_max == self._F_max[i] and fixed == self._F_fixed[i]:
+                break
+            self._F_min[i] = prev_min = cur_min
+            self._F_max[i] = prev_max = cur_max
+            self._F_fixed[i] = fixed
+            last = i
+
+        top = max(last, k - 1)
+        if top < 0:
+            return
+        if top == n - 1:
+            self.P_min[n-1], self.P_max[n-1] = self._pan_bounds()
+            top = n - 2
+
+        for i in range(top, -1, -1):
+            cur_min, cur_max, fixed = self._backward_step(i)
+            if (i < k - 1 and cur_min == self.P_min[i] and cur_max == self.P_max[i]
+                    and fixed == self._P_fixed[i]):
+                break
+            self.P_min[i] = cur_min
+            self.P_max[i] = cur_max
+            self._P_fixed[i] = fixed
+
+    def _copy(self):
+        other = PassingBounds.__new__(PassingBounds)
+        other.n = self.n
+        other.env_lower = self.env_lower
+        other.env_upper = self.env_upper
+        other.total_weight = self.total_weight
+        for name in ("locked", "drop", "_F_min", "_F_max", "P_min", "P_max", "_F_fixed", "_P_fixed"):
+            setattr(other, name, getattr(self, name).copy())
+        return other
@@ -1,23 +1,46 @@
 import numpy as np
+from core import gradation_ops
 from core.constraints import clamp_curve
+from core.gradation_engine import GradationEngine
+from core.material_spec import envelope_limits
 
 class RandomCurveGenerator:
 
-    def generate(self, sieve_sizes, lower, upper):
+    def __init__(self, grad_engine=None):
+        # Engine supplies total weight + feasible passing bounds for locked generation
+        self.grad_engine = grad_engine or GradationEngine()
+
+    def generate(self, sieve_sizes, lower, upper, method="mcmc", locked_rows=None, retained=None, spec=None):
         """
         Generates a highly variable, "wiggly" random passing curve.
         Uses a Monte Carlo Markov Chain (MCMC) approach to explore the entire valid space,
         ensuring strict envelope compliance and monotonicity without statistical bias.
+
+        method="uniform" draws one curve exactly uniformly from the valid space instead
+        (see generate_batch).
+        If locked_rows (indices or boolean mask) is given, the curve keeps retained[i]
+        exact for every locked row.
+        spec: the MaterialSpec lower / upper come from, whose precomputed envelope
+        and masks are then used instead of being rebuilt (see generate_batch).
         """
+        locked = gradation_ops.lock_mask(locked_rows, len(lower))
+        if method == "uniform" or locked.any():
+            return self.generate_batch(
+                1, sieve_sizes, lower, upper, method=method,
+                locked_rows=locked, retained=retained, spec=spec
+            )[0].tolist()
+
         n = len(lower)
         curve = np.zeros(n)
+
+        # Strict limits with 0.1 margin, computed once for the whole chain
+        env_lower, env_upper, zero_rows, fixed_rows = self._envelope(lower, upper, spec)
         
         # 1. Initialize with a valid curve (hugging the upper limit)
         prev_passing = 100.0
         for i in range(n):
-            env_U = upper[i] - 0.1 if lower[i] < upper[i] else upper[i]
-            val = min(env_U, prev_passing)
-            if i == n - 1 or (lower[i] == 0 and upper[i] == 0):
+            val = min(env_upper[i], prev_passing)
+            if zero_rows[i]:
                 val = 0.0
             curve[i] = val
             prev_passing = val
@@ -28,19 +51,16 @@ class RandomCurveGenerator:
             # Pick a random sieve
             i = np.random.randint(0, n)
             
-            # Pan is always 0, and if limits are tightly fixed to 100, ignore
-            if i == n - 1 or (lower[i] == 0 and upper[i] == 0) or (lower[i] == 100 and upper[i] == 100):
+            # Pan is always 0, and sieves with fixed limits (e.g. 100 / 100) never move
+            if zero_rows[i] or fixed_rows[i]:
                 continue
-                
-            env_L = lower[i] + 0.1 if lower[i] < upper[i] else lower[i]
-            env_U = upper[i] - 0.1 if lower[i] < upper[i] else upper[i]
             
             prev_P = curve[i-1] if i > 0 else 100.0
             next_P = curve[i+1] if i < n-1 else 0.0
             
             # Valid range for curve[i] based on current neighbors and limits
-            max_val = min(env_U, prev_P)
-            min_val = max(env_L, next_P)
+            max_val = min(env_upper[i], prev_P)
+            min_val = max(env_lower[i], next_P)
             
             if min_val <= max_val:
                 # 20% chance to jump to an extreme edge (creates jagged/wiggly shapes)
@@ -52,3 +72,205 @@ class RandomCurveGenerator:
 
         return curve.tolist()
 
+
+    def generate_batch(self, n, sieve_sizes, lower, upper, iterations=3000, rng=None, method="mcmc",
+                       locked_rows=None, retained=None, spec=None):
+        """
+        Generates n independent random passing curves at once.
+
+        method="mcmc" runs the same MCMC moves as generate(), but every chain advances
+        in the same array operation, so the cost per iteration no longer scales with
+        Python overhead per curve.
+        method="uniform" draws each curve exactly uniformly from the valid space
+        (envelope margin, monotonicity, Pan = 0) with no burn-in; iterations is ignored.
+
+        With locked_rows (table indices or boolean mask) and retained weights, every curve keeps the
+        locked retained weights exact. Sampling then walks the feasible bounds from
+        GradationEngine.compute_valid_passing_ranges (no rejection), whatever the method.
+
+        rng may be a seed or an np.random.Generator (for reproducible batches).
+        spec: the MaterialSpec lower / upper come from; its envelope, pan_mask and
+        fixed_mask are used directly instead of being rebuilt from the limits.
+        Returns an (n x sieves) ndarray in table order.
+        """
+        if method not in ("mcmc", "uniform"):
+            raise ValueError(f"Unknown sampling method: {method!r}")
+
+        rng = np.random.default_rng(rng)
+
+        env_L, env_U, zero_rows, fixed_rows = self._envelope(lower, upper, spec)
+
+        locked = gradation_ops.lock_mask(locked_rows, len(lower))
+        if locked.any():
+            return self._sample_locked(n, lower, upper, (env_L, env_U), locked, retained, rng)
+
+        sieves = len(lower)
+
+        if method == "uniform":
+            return self._sample_uniform(n, env_L, env_U, zero_rows, rng)
+
+        # Pan is always 0, and sieves with fixed limits (e.g. 100 / 100) never move
+        movable = ~(zero_rows | fixed_rows)
+
+        # Chains are stored with sentinels: column 0 = 100 (above first sieve),
+        # last column = 0 (below Pan), so neighbours never need bounds checks.
+        padded = np.empty((n, sieves + 2))
+        padded[:, 0] = 100.0
+        padded[:, -1] = 0.0
+
+        # 1. Initialize every chain with the valid curve hugging the upper limit
+        prev_passing = 100.0
+        for i in range(sieves):
+            val = 0.0 if zero_rows[i] else min(env_U[i], prev_passing)
+            padded[:, i + 1] = val
+            prev_passing = val
+
+        # 2. Mutate one random sieve per chain per iteration
+        rows = np.arange(n)
+        for _ in range(iterations):
+            idx = rng.integers(0, sieves, size=n)
+            col = idx + 1
+
+            min_val = np.maximum(env_L[idx], padded[rows, col + 1])
+            max_val = np.minimum(env_U[idx], padded[rows, col - 1])
+            ok = movable[idx] & (min_val <= max_val)
+
+            # 20% chance to jump to an extreme edge, 80% uniform
+            to_edge = rng.random(n) < 0.2
+            low_edge = rng.random(n) < 0.5
+            uniform = rng.uniform(min_val, np.maximum(min_val, max_val))
+            new_val = np.where(to_edge, np.where(low_edge, min_val, max_val), uniform)
+
+            padded[rows[ok], col[ok]] = new_val[ok]
+
+        return padded[:, 1:-1].copy()
+
+    @staticmethod
+    def _envelope(lower, upper, spec=None):
+        """
+        Strict limits with 0.1 margin, unless lower == upper (e.g. 100), the rows
+        pinned to 0 (Pan, and 0/0 limits) and the rows with fixed limits
+        (lower == upper). Taken from spec when given, else built from the limits.
+        """
+        if spec is not None:
+            env_L, env_U = spec.envelope
+            zero_rows = spec.pan_mask | (spec.fixed_mask & (spec.lower == 0))
+            return env_L, env_U, zero_rows, spec.fixed_mask
+
+        lower = np.asarray(lower, dtype=float)
+        upper = np.asarray(upper, dtype=float)
+        env_L, env_U = envelope_limits(lower, upper)
+
+        zero_rows = (lower == 0) & (upper == 0)
+        if len(zero_rows):
+            zero_rows[-1] = True
+        return env_L, env_U, zero_rows, lower == upper
+
+    def _sample_uniform(self, n, env_L, env_U, zero_rows, rng):
+        """
+        Exact uniform sampling over the monotone envelope polytope.
+
+        Sieves are drawn one after another from their exact conditional distribution.
+        F[i](x) is the volume of valid tails (sieve i .. Pan) whose sieve i passing is
+        <= x. Given the previous sieve's passing x, sieve i has density proportional to
+        F[i+1] on [env_L, min(x, env_U)], which is sampled by inverting F[i].
+        Fixed sieves (Pan, 0/0, or lower == upper) are point masses.
+        """
+        sieves = len(env_L)
+        fixed = zero_rows | (env_L >= env_U)
+        point = np.where(zero_rows, 0.0, env_L)
+
+        # Every F[i] is a piecewise polynomial on the same breakpoints.
+        # One extra breakpoint above 100 keeps x = 100 inside the last piece.
+        knots = np.unique(np.concatenate([env_L, env_U, point, [0.0, 100.0]]))
+        knots = np.append(knots, knots[-1] + 1.0)
+        widths = np.diff(knots)
+        pieces = len(widths)
+        degree = sieves + 1
+
+        def evaluate(coeffs, x):
+            k = np.clip(np.searchsorted(knots, x, side="right") - 1, 0, pieces - 1)
+            s = x - knots[k]
+            value = np.zeros_like(s)
+            for d in range(degree, -1, -1):
+                value = value * s + coeffs[k, d]
+            return value
+
+        # F[i] coefficients per piece in local coordinates (x - knots[k]), low order first
+        F = [None] * (sieves + 1)
+        F[sieves] = np.zeros((pieces, degree + 1))
+        F[sieves][:, 0] = 1.0
+
+        for i in range(sieves - 1, -1, -1):
+            coeffs = np.zeros((pieces, degree + 1))
+            if fixed[i]:
+                # F[i](x) = F[i+1](c) for x >= c, else 0
+                c = point[i]
+                coeffs[knots[:-1] >= c, 0] = evaluate(F[i + 1], np.array([c]))[0]
+            else:
+                # F[i](x) = integral of F[i+1] over [env_L, min(x, env_U)]
+                inside = (knots[:-1] >= env_L[i]) & (knots[1:] <= env_U[i])
+                powers = np.arange(1, degree + 1)
+                coeffs[:, 1:] = F[i + 1][:, :-1] / powers
+                coeffs[~inside] = 0.0
+
+                # Piece integrals accumulate into the constant term of later pieces
+                s_end = widths[:, None] ** np.arange(degree + 1)
+                piece_total = (coeffs * s_end).sum(axis=1)
+                coeffs[:, 0] += np.concatenate([[0.0], np.cumsum(piece_total)[:-1]])
+            F[i] = coeffs
+
+        curves = np.empty((n, sieves))
+        prev = np.full(n, 100.0)
+
+        for i in range(sieves):
+            if fixed[i]:
+                curves[:, i] = point[i]
+                prev = curves[:, i]
+                continue
+
+            lo = np.full(n, env_L[i])
+            hi = np.maximum(lo, np.minimum(prev, env_U[i]))
+            target = rng.random(n) * evaluate(F[i], hi)
+
+            # Invert the (non-decreasing) conditional CDF by bisection
+            a, b = lo.copy(), hi.copy()
+            for _ in range(50):
+                mid = 0.5 * (a + b)
+                below = evaluate(F[i], mid) < target
+                a = np.where(below, mid, a)
+                b = np.where(below, b, mid)
+            curves[:, i] = 0.5 * (a + b)
+            prev = curves[:, i]
+
+        return curves
+
+    def _sample_locked(self, n, lower, upper, envelope, locked, retained, rng):
+        """
+        Sequential sampling that keeps locked retained weights exact.
+
+        P_min/P_max from compute_valid_passing_ranges are the exact per-sieve
+        ranges of the feasible set, so walking top → Pan never dead-ends:
+        - locked row: passing = previous passing - locked drop
+        - unlocked row: uniform on [P_min, min(P_max, previous passing)]
+        """
+        # One read of the shared weight, so the bounds and the drops agree
+        total_wt = self.grad_engine.total_weight
+        P_min, P_max = gradation_ops.compute_valid_passing_ranges(
+            retained, locked, lower, upper, total_wt, envelope=envelope
+        )
+
+        sieves = len(lower)
+        curves = np.empty((n, sieves))
+        prev = np.full(n, 100.0)
+
+        for i in range(sieves):
+            if locked[i]:
+                curves[:, i] = prev - retained[i] / total_wt * 100.0
+            else:
+                hi = np.minimum(P_max[i], prev)
+                lo = np.minimum(P_min[i], hi)
+                curves[:, i] = rng.uniform(lo, hi)
+            prev = curves[:, i]
+
+        return curves
@@ -0,0 +1,157 @@
+import os
+
+from config.materials import materials
+
+
+def _column_index(letters):
+    """Excel column letters → 1-based index ("A" → 1, "AB" → 28)."""
+    index = 0
+    for ch in letters.upper():
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index
+
+
+def _split_cell(ref):
+    """Excel cell reference → (row, column index), e.g. "E17" → (17, 5)."""
+    letters = ref.rstrip("0123456789")
+    return int(ref[len(letters):]), _column_index(letters)
+
+
+def _require_openpyxl():
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError(
+            "Workbook export requires openpyxl (pip install openpyxl)"
+        ) from e
+    return openpyxl
+
+
+def sheet_cells(data, passing, retained, total_weight):
+    """
+    Map one gradation result onto the sheet layout described by a material spec.
+    data is a dict from config/materials.py; passing / retained are in table order.
+
+    Row k of sieve_range holds sieve k. If the template has fewer rows than the
+    spec has sieves, the extra sieves (e.g. Pan) are not written.
+    Returns {(row, column index): value}.
+    """
+    cells = {}
+    columns = {
+        "sieve": _column_index(data["sieve_column"]),
+        "weight": _column_index(data["weight_column"]),
+        "passing": _column_index(data["passing_column"]),
+        "lower": _column_index(data["lower_column"]),
+        "upper": _column_index(data["upper_column"]),
+    }
+
+    rows = zip(
+        data["sieve_range"], data["sieve_sizes"], data["lower_limits"],
+        data["upper_limits"], passing, retained
+    )
+    for row, sieve, lower, upper, pct, weight in rows:
+        cells[(row, columns["sieve"])] = sieve
+        cells[(row, columns["weight"])] = float(weight)
+        cells[(row, columns["passing"])] = float(pct)
+        cells[(row, columns["lower"])] = lower
+        cells[(row, columns["upper"])] = upper
+
+    cells[_split_cell(data["total_weight_cell"])] = float(total_weight)
+    return cells
+
+
+def fill_template(template_path, output_path, material_key, passing, retained, total_weight, sheet_name=None):
+    """
+    Write one result into a copy of an existing Excel template.
+    Loads the whole template, so use StreamingWorkbookWriter for bulk output.
+    """
+    openpyxl = _require_openpyxl()
+    workbook = openpyxl.load_workbook(template_path)
+    sheet = workbook[sheet_name] if sheet_name else workbook.active
+
+    for (row, col), value in sheet_cells(materials[material_key], passing, retained, total_weight).items():
+        sheet.cell(row=row, column=col, value=value)
+
+    workbook.save(output_path)
+
+
+def part_path(path, part):
+    """Path of workbook part (1-based): part 1 is path itself, then "out-2.xlsx", "out-3.xlsx", ..."""
+    if part == 1:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{part}{ext}"
+
+
+class StreamingWorkbookWriter:
+    """
+    Write-only xlsx writer: one sheet per gradation result, each laid out with the
+    material's sieve_range / column metadata.
+    Sheets are streamed to disk as they are added, so memory stays bounded
+    for thousands of sheets.
+
+    openpyxl keeps one temporary file open per write-only sheet until the
+    workbook is saved, so at most sheets_per_file sheets go into one workbook;
+    further sheets roll over into numbered parts (see part_path). paths lists
+    the files written.
+
+        with StreamingWorkbookWriter("out.xlsx", "fine") as writer:
+            writer.add_sheet(passing, retained, total_weight)
+    """
+
+    # Well under the smallest common open-file limits (256 on macOS, 512 on Windows)
+    DEFAULT_SHEETS_PER_FILE = 200
+
+    def __init__(self, path, material_key, sheets_per_file=DEFAULT_SHEETS_PER_FILE):
+        if sheets_per_file < 1:
+            raise ValueError("sheets_per_file must be >= 1")
+        self._openpyxl = _require_openpyxl()
+        self.path = path
+        self.data = materials[material_key]
+        self.sheets_per_file = sheets_per_file
+        self.paths = []
+        self.workbook = None
+        self._file_sheets = 0
+        self.sheet_count = 0
+
+    def add_sheet(self, passing, retained, total_weight, title=None):
+        if self.workbook is None or self._file_sheets == self.sheets_per_file:
+            self._next_part()
+
+        self.sheet_count += 1
+        self._file_sheets += 1
+        sheet = self.workbook.create_sheet(title or f"Sample {self.sheet_count}")
+
+        cells = sheet_cells(self.data, passing, retained, total_weight)
+
+        # Write-only sheets are filled strictly row by row
+        last_row = max(row for row, _ in cells)
+        last_col = max(col for _, col in cells)
+        for row in range(1, last_row + 1):
+            values = [cells.get((row, col)) for col in range(1, last_col + 1)]
+            sheet.append(values if any(v is not None for v in values) else [])
+
+    def _next_part(self):
+        """Save the current part (closing its sheets' temp files) and start the next."""
+        self._save()
+        self.workbook = self._openpyxl.Workbook(write_only=True)
+        self._file_sheets = 0
+        self.paths.append(part_path(self.path, len(self.paths) + 1))
+
+    def _save(self):
+        if self.workbook is not None:
+            self.workbook.save(self.paths[-1])
+            self.workbook = None
+
+    def close(self):
+        if not self.paths:
+            self._next_part()  # No sheets added: still write an (empty) workbook
+        self._save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Don't leave a half-written workbook behind on errors
+        if exc_type is None:
+            self.close()
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from config.materials import materials
+from core import gradation_ops
+from core.material_spec import get_spec
+from core.random_generator import RandomCurveGenerator
+
+
+def _valid_curves(material_key, method, count=100, seed=0):
+    """Curves inside the envelope, including the edge values the samplers jump to."""
+    spec = get_spec(material_key)
+    return RandomCurveGenerator().generate_batch(
+        count, spec.sieve_sizes, spec.lower, spec.upper, rng=seed, method=method, spec=spec
+    )
+
+
+@pytest.mark.parametrize("method", ["mcmc", "uniform"])
+@pytest.mark.parametrize("material_key", sorted(materials))
+def test_locking_rows_of_a_valid_curve_is_feasible(material_key, method):
+    spec = get_spec(material_key)
+    rng = np.random.default_rng(1)
+
+    for curve in _valid_curves(material_key, method):
+        weight = float(rng.choice([1000.0, 2000.0, 5000.0]))
+        retained = gradation_ops.passing_to_retained(curve, weight)
+
+        # The curve itself satisfies any subset of its own locks
+        masks = [rng.random(spec.n) < 0.5] + [np.eye(spec.n, dtype=bool)[row] for row in range(spec.n)]
+        for mask in masks:
+            report = gradation_ops.check_lock_feasibility(
+                retained, mask, spec.lower, spec.upper, weight, envelope=spec.envelope
+            )
+            assert report.feasible, report.describe(spec.sieve_sizes)
+
+
+def test_real_conflict_is_still_reported():
+    spec = get_spec("fine")
+    weight = 2000.0
+    passing = np.array([100.0, 99.9, 75.1, 55.1, 35.1, 8.1, 0.1, 0.0])
+    retained = gradation_ops.passing_to_retained(passing, weight)
+    retained[2] += 10.0  # 0.5% more drop than 4.75 → 2.36 mm can take
+    mask = np.zeros(spec.n, dtype=bool)
+    mask[[1, 2]] = True
+
+    report = gradation_ops.check_lock_feasibility(
+        retained, mask, spec.lower, spec.upper, weight, envelope=spec.envelope
+    )
+    assert not report.feasible
+    assert report.kind == "excess"
+    assert report.relaxation == pytest.approx(10.0)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from config.materials import materials
+from core import gradation_ops
+from core.material_spec import get_spec
+from core.passing_bounds import PassingBounds
+from core.random_generator import RandomCurveGenerator
+
+
+@pytest.mark.parametrize("material_key", sorted(materials))
+def test_locking_rows_of_a_valid_curve_is_feasible(material_key):
+    spec = get_spec(material_key)
+    rng = np.random.default_rng(2)
+    curves = RandomCurveGenerator().generate_batch(
+        100, spec.sieve_sizes, spec.lower, spec.upper, rng=0, spec=spec
+    )
+    bounds = PassingBounds(spec.lower, spec.upper, envelope=spec.envelope)
+
+    for curve in curves:
+        weight = float(rng.choice([1000.0, 2000.0, 5000.0]))
+        retained = gradation_ops.passing_to_retained(curve, weight)
+        bounds.update(rng.random(spec.n) < 0.5, retained, weight)
+        assert bounds.feasible
+
+
+@pytest.mark.parametrize("material_key", sorted(materials))
+def test_feasible_matches_check_lock_feasibility(material_key):
+    spec = get_spec(material_key)
+    rng = np.random.default_rng(3)
+
+    for _ in range(500):
+        weight = 2000.0
+        retained = rng.random(spec.n)
+        retained *= weight / retained.sum()
+        mask = rng.random(spec.n) < rng.random()
+
+        bounds = PassingBounds(spec.lower, spec.upper, envelope=spec.envelope)
+        bounds.update(mask, retained, weight)
+        report = gradation_ops.check_lock_feasibility(
+            retained, mask, spec.lower, spec.upper, weight, envelope=spec.envelope
+        )
+        assert bounds.feasible == report.feasible
@@ -0,0 +1,46 @@
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+resource = pytest.importorskip("resource")  # POSIX only
+
+from core.material_spec import get_spec
+from core.workbook_exporter import StreamingWorkbookWriter, part_path
+
+
+@pytest.fixture
+def low_fd_limit():
+    """Lower the soft open-file limit so one file per sheet would exhaust it."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    limit = 128
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+    yield limit
+    resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_more_sheets_than_open_file_limit(tmp_path, low_fd_limit):
+    spec = get_spec("fine")
+    passing = (spec.lower + spec.upper) / 2
+    retained = [100.0] * spec.n
+    count = 3 * low_fd_limit
+    path = str(tmp_path / "report.xlsx")
+
+    with StreamingWorkbookWriter(path, "fine", sheets_per_file=50) as writer:
+        for _ in range(count):
+            writer.add_sheet(passing, retained, 2000.0)
+
+    parts = -(-count // 50)
+    assert writer.paths == [part_path(path, k) for k in range(1, parts + 1)]
+
+    names = []
+    for part in writer.paths:
+        workbook = openpyxl.load_workbook(part, read_only=True)
+        names += workbook.sheetnames
+        workbook.close()
+    assert names == [f"Sample {k}" for k in range(1, count + 1)]
+
+
+def test_single_file_below_limit(tmp_path):
+    path = str(tmp_path / "report.xlsx")
+    with StreamingWorkbookWriter(path, "fine") as writer:
+        writer.add_sheet([100.0] * 8, [0.0] * 8, 2000.0)
+    assert writer.paths == [path]
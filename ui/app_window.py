@@ -5,6 +5,8 @@ from ui.graph_panel import GraphPanel
 from ui.table_panel import TablePanel
 from ui.footer import Footer
 from core.total_weight import TotalWeightManager
+from core.gradation_engine import GradationEngine
+from core.gradation_state import GradationState
 import os
 import sys
 
@@ -17,6 +19,9 @@ class GradationApp(ctk.CTk):
         # Create shared total weight manager for all components
         self.total_weight_manager = TotalWeightManager()
 
+        # Shared curve / locks model; panels subscribe, notifications coalesce per Tk event
+        self.state = GradationState(GradationEngine(self.total_weight_manager), scheduler=self.after_idle)
+
         # Set dark theme
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
@@ -114,22 +119,7 @@ class GradationApp(ctk.CTk):
     def _on_material_change(self, material_key):
         """
         Triggered when user switches material tabs.
+        The state restores the material's session (curve, locks, weight) or its
+        defaults; every panel reloads from one notification.
         """
-        from config.materials import materials
-        
-        # Set material-specific default weight FIRST
-        mat_data = materials[material_key]
-        default_weight = mat_data.get("default_weight", 5000)
-        self.total_weight_manager.set_total_weight(default_weight)
-        
-        # Load table (uses the new weight for retained calculation)
-        self.table_panel.load_material(material_key)
-
-        # Load input panel (updates weight display)
-        self.input_panel.load_material(material_key)
-        
-        # Load graph
-        self.graph_panel.load_material(material_key)
-        
-        # Final sync: update FM from initial retained values
-        self.input_panel.update_fm(self.table_panel.retained)
+        self.state.load_material(material_key)
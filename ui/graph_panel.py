@@ -1,11 +1,15 @@
 import customtkinter as ctk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba_array
+from matplotlib.markers import MarkerStyle
 import numpy as np
 import time
-from config.materials import materials
+from core.material_spec import get_spec
 from core.constraints import clamp_curve
 from core.gradation_engine import GradationEngine
+from core.gradation_state import MATERIAL, PASSING, LOCKS
+from core.curve_smoothing import CurveSmoother
 
 class GraphPanel(ctk.CTkFrame):
 
@@ -13,40 +17,54 @@ class GraphPanel(ctk.CTkFrame):
         super().__init__(parent, fg_color="#0f172a", corner_radius=15)
 
         self.material_key = "fine"
-        self.data = materials[self.material_key]
+        self.spec = get_spec(self.material_key)
 
         # Get shared total weight manager from parent app
         self.grad_engine = GradationEngine(parent.total_weight_manager)
 
+        # Shared model; edits made by this panel are drawn here, not echoed back
+        self.state = parent.state
+        self.state.subscribe(self._on_state_change, (MATERIAL, PASSING, LOCKS), owner=self)
+
         self.sieve_sizes = []
         self.sieve_labels = []
         self.lower = []
         self.upper = []
-        self.obtained = []
+        self.env_lower = []  # Edits clamp to the margin envelope, like the lock checks
+        self.env_upper = []
 
         self.drag_index = None
         self.selected_index = None  # Track which point is selected
-        self.updating_from_table = False  # Flag to prevent circular updates
 
         # Precision controls
         self.snap_enabled = False
         self.snap_value = 0.5  # Snap to nearest 0.5%
         self.step_size = 0.1   # Arrow key step size
         self.shift_held = False  # Track shift key for precision mode
+        self.smoothing = "linear"  # Curve rendering: "linear" or shape-preserving "pchip"
 
         # Drag tracking for precision mode
         self._drag_start_y = None
         self._drag_start_value = None
 
-        # Throttle redraws during drag (target ~60fps)
-        self._last_draw_time = 0
-        self._min_draw_interval = 0.016  # ~60fps
+        # Drag pipeline: motion events only record the pointer; the graph is
+        # updated once per frame and the table + FM at a lower rate
+        self.drag_frame_ms = 16   # ~60fps graph updates
+        self.drag_sync_ms = 100   # Table / FM sync interval while dragging
+        self._pending_drag_y = None
+        self._drag_frame_job = None
+        self._last_sync_time = 0
+
+        # Keyboard edits: key presses apply at once, settle + draw once per frame
+        self._edit_index = None
+        self._edit_frame_job = None
 
         # Blitting support — artist references
         self._obtained_line = None
         self._obtained_glow = None
-        self._scatter_artists = []
+        self._points = None
         self._background = None
+        self._static_layers = {}  # (material, smoothing, width, height) -> (pixels, layout)
 
         self._build_graph()
         self._build_controls()
@@ -76,6 +94,7 @@ class GraphPanel(ctk.CTkFrame):
         self.canvas.mpl_connect("motion_notify_event", self._on_drag)
         self.canvas.mpl_connect("button_release_event", self._on_release)
         self.canvas.mpl_connect("key_press_event", self._on_mpl_key_press)
+        self.canvas.mpl_connect("resize_event", self._on_resize)
 
         # Bind keyboard events at the Tkinter level (parent window)
         self.master.bind("<Up>", self._on_key_up_tkinter, add=True)
@@ -140,6 +159,18 @@ class GraphPanel(ctk.CTkFrame):
         )
         self.snap_selector.set("0.5")
         self.snap_selector.pack(side="left", padx=(0, 10))
+
+        # Smooth (PCHIP) curve rendering toggle
+        self.smooth_var = ctk.BooleanVar(value=False)
+        self.smooth_check = ctk.CTkCheckBox(
+            row2, text="Smooth", font=("Segoe UI", 10),
+            variable=self.smooth_var,
+            command=self._on_smooth_toggle,
+            fg_color="#0891b2", hover_color="#06b6d4",
+            width=20, height=20,
+            checkbox_width=18, checkbox_height=18
+        )
+        self.smooth_check.pack(side="left", padx=(0, 10))
         
         # Step size label + selector
         step_label = ctk.CTkLabel(row2, text="Step:", font=("Segoe UI", 10), text_color="#94a3b8")
@@ -167,6 +198,12 @@ class GraphPanel(ctk.CTkFrame):
     def _on_snap_toggle(self):
         self.snap_enabled = self.snap_var.get()
 
+    def _on_smooth_toggle(self):
+        self.smoothing = "pchip" if self.smooth_var.get() else "linear"
+        # Limit curves and envelope are smoothed too, so rebuild the artists
+        if self._obtained_line is not None:
+            self._build_artists()
+
     def _on_snap_value_change(self, val):
         try:
             self.snap_value = float(val)
@@ -185,50 +222,98 @@ class GraphPanel(ctk.CTkFrame):
 
     def load_material(self, material_key):
         self.material_key = material_key
-        self.data = materials[material_key]
+        self.spec = get_spec(material_key)
 
-        # Load sieve data from config and REVERSE for left-to-right display (small to large)
-        sieve_labels = list(reversed(self.data["sieve_sizes"]))
-        lower_limits = np.array(list(reversed(self.data["lower_limits"])), dtype=float)
-        upper_limits = np.array(list(reversed(self.data["upper_limits"])), dtype=float)
-        
-        n = len(sieve_labels)
+        # Graph-order (small to large, left to right) views of the shared spec
+        n = self.spec.n
         self.sieve_sizes = np.arange(n)  # 0, 1, 2, ... for x-axis positions
-        self.sieve_labels = sieve_labels  # Store labels for display (small to large: left to right)
-        self.lower = lower_limits
-        self.upper = upper_limits
-        # Initialize obtained curve with midpoint between upper and lower limits
-        self.obtained = (self.lower + self.upper) / 2
-
-        # Reset selection
+        self.sieve_labels = self.spec.sieve_labels_graph  # Labels for display (small to large: left to right)
+        self.lower = self.spec.lower_graph
+        self.upper = self.spec.upper_graph
+        self.env_lower = self.spec.env_lower[::-1]
+        self.env_upper = self.spec.env_upper[::-1]
+
+        # Reset selection and drop frames queued for the previous material
+        for job in (self._drag_frame_job, self._edit_frame_job):
+            if job is not None:
+                self.after_cancel(job)
+        self._drag_frame_job = None
+        self._edit_frame_job = None
+        self._edit_index = None
         self.selected_index = None
         self.drag_index = None
-        self._background = None
 
-        self._redraw_graph()
+        self._build_artists()
+
+    def _on_state_change(self, changed):
+        if MATERIAL in changed:
+            self.load_material(self.state.material_key)
+        else:
+            self._redraw_graph()
 
     # ----------------------------------------------------
-    # HELPER: Get locked indices in graph order
+    # SHARED CURVE STATE (graph-order views)
     # ----------------------------------------------------
 
-    def _get_locked_graph_indices(self):
-        """Convert table-order locked rows to graph-order indices."""
-        parent = self.master
-        if not hasattr(parent, 'table_panel'):
-            return set()
-        
-        locked_table = parent.table_panel.locked_rows
+    @property
+    def obtained(self):
+        """
+        Graph-order view of the state's passing buffer.
+        Graph order is reversed from table order (table index i → graph index n-1-i),
+        so this is a reversed-stride view: reads and in-place writes go straight
+        to the shared buffer without copying.
+        """
+        return self.state.passing[::-1]
+
+    def _get_locked_graph_mask(self):
+        """Graph-order view of the state's boolean lock mask."""
+        return self.state.locked_mask[::-1]
+
+    # ----------------------------------------------------
+    # HELPER: Settle curve after an edit
+    # ----------------------------------------------------
+
+    def _settle_curve(self, locked_graph, pinned_index=None):
+        """
+        Project the shared curve onto the closest valid curve (limits + monotonic), in place.
+        Locked points keep their retained weight, so they move with the point above
+        them instead of blocking it. pinned_index is the point being edited; it is
+        held so that its neighbours give way instead of pulling it back.
+        """
+        state = self.state
         n = len(self.obtained)
-        # Graph order is reversed from table order
-        # table index i → graph index (n-1-i)
-        return {(n - 1 - i) for i in locked_table}
+        pinned_row = None if pinned_index is None else n - 1 - pinned_index
+        state.passing[:] = self.grad_engine.project_monotone_locked_retained(
+            state.passing, self.spec.env_lower, self.spec.env_upper, locked_graph[::-1],
+            state.retained, pinned_row=pinned_row
+        )
 
     # ----------------------------------------------------
     # DRAW GRAPH
     # ----------------------------------------------------
 
-    def _redraw_graph(self):
-        """Redraws the entire graph with current data"""
+    # Point style table, indexed by point code: 0 = normal, 1 = selected, 2 = locked
+    _POINT_FACE = to_rgba_array(["#22d3ee", "#f59e0b", "#ef4444"])
+    _POINT_EDGE = to_rgba_array(["white", "#fbbf24", "#fca5a5"])
+    _POINT_SIZE = np.array([80, 130, 100])
+    _POINT_WIDTH = np.array([1.5, 2.5, 2.5])
+    _POINT_MARKER = ("o", "o", "s")  # Locked = red square, can't be dragged
+
+    @staticmethod
+    def _marker_path(marker):
+        style = MarkerStyle(marker)
+        return style.get_path().transformed(style.get_transform())
+
+    def _smooth(self, values):
+        """Densely interpolated curve for the line artists (precomputed operator)."""
+        return self._smoother.smooth(values)
+
+    def _build_artists(self):
+        """
+        Build every artist for the current material once: envelope, limit lines,
+        obtained curve, points, ticks and legend, then lay out the figure.
+        Later changes only update data on these artists (see _update_artists).
+        """
         self.ax.clear()
         self.ax.set_facecolor('#0f172a')
         self.ax.tick_params(colors="#94a3b8", labelsize=9, length=4, width=0.5)
@@ -241,24 +326,22 @@ class GraphPanel(ctk.CTkFrame):
         self.ax.grid(True, alpha=0.12, color="#475569", linestyle="-", linewidth=0.5)
         self.ax.set_axisbelow(True)
 
+        self._obtained_line = None
+        self._obtained_glow = None
+        self._points = None
+        self._background = None
+
         n = len(self.sieve_sizes)
         if n == 0:
             self.canvas.draw_idle()
             return
 
-        locked_graph = self._get_locked_graph_indices()
-
-        # Create smooth interpolation for curves
-        if n > 2:
-            x_smooth = np.linspace(0, n - 1, n * 10)
-            lower_smooth = np.interp(x_smooth, self.sieve_sizes, self.lower)
-            upper_smooth = np.interp(x_smooth, self.sieve_sizes, self.upper)
-            obtained_smooth = np.interp(x_smooth, self.sieve_sizes, self.obtained)
-        else:
-            x_smooth = self.sieve_sizes
-            lower_smooth = self.lower
-            upper_smooth = self.upper
-            obtained_smooth = self.obtained
+        # Smoothing operator for this material; later redraws only smooth the obtained curve
+        self._smoother = CurveSmoother(n, method=self.smoothing)
+        x_smooth = self._smoother.x
+        lower_smooth = self._smooth(self.lower)
+        upper_smooth = self._smooth(self.upper)
+        obtained_smooth = self._smooth(self.obtained)
 
         # Shaded grading envelope
         self.ax.fill_between(x_smooth, lower_smooth, upper_smooth, alpha=0.07, color="#0ea5e9", linewidth=0)
@@ -267,30 +350,14 @@ class GraphPanel(ctk.CTkFrame):
         self.ax.plot(x_smooth, lower_smooth, color="#64748b", linewidth=1.5, linestyle="--", alpha=0.6, label="Lower Limit")
         self.ax.plot(x_smooth, upper_smooth, color="#64748b", linewidth=1.5, linestyle="--", alpha=0.6, label="Upper Limit")
 
-        # Obtained curve with glow effect (hidden initially for background capture)
-        self._obtained_glow, = self.ax.plot(x_smooth, obtained_smooth, color="#0ea5e9", linewidth=5, alpha=0.12, zorder=2, visible=False)
-        self._obtained_line, = self.ax.plot(x_smooth, obtained_smooth, color="#06b6d4", linewidth=2.5, label="Obtained", zorder=3, visible=False)
+        # Obtained curve with glow effect
+        self._obtained_glow, = self.ax.plot(x_smooth, obtained_smooth, color="#0ea5e9", linewidth=5, alpha=0.12, zorder=2)
+        self._obtained_line, = self.ax.plot(x_smooth, obtained_smooth, color="#06b6d4", linewidth=2.5, label="Obtained", zorder=3)
 
-        # Draggable points with selection + lock highlighting
-        self._scatter_artists = []
-        for i in range(n):
-            is_locked = i in locked_graph
-            is_selected = (i == self.selected_index)
-            
-            if is_locked:
-                # Locked point — red ring, can't be dragged
-                artist = self.ax.scatter(self.sieve_sizes[i], self.obtained[i],
-                    color="#ef4444", s=100, edgecolor="#fca5a5", zorder=6, linewidth=2.5,
-                    marker='s', visible=False)
-            elif is_selected:
-                # Selected point — gold highlight
-                artist = self.ax.scatter(self.sieve_sizes[i], self.obtained[i],
-                    color="#f59e0b", s=130, edgecolor="#fbbf24", zorder=6, linewidth=2.5, visible=False)
-            else:
-                # Normal point
-                artist = self.ax.scatter(self.sieve_sizes[i], self.obtained[i],
-                    color="#22d3ee", s=80, edgecolor="white", zorder=5, linewidth=1.5, visible=False)
-            self._scatter_artists.append(artist)
+        # Draggable points: one collection, styled per point in _update_artists
+        self._points = self.ax.scatter(self.sieve_sizes, self.obtained, zorder=6)
+        self._point_codes = None
+        self._marker_paths = [self._marker_path(m) for m in self._POINT_MARKER]
 
         # Smart sieve labels
         def fmt_sieve(x):
@@ -312,82 +379,127 @@ class GraphPanel(ctk.CTkFrame):
             loc='upper left', framealpha=0.95, fontsize=9
         )
         self.ax.set_ylim(-5, 110)
-        self.figure.tight_layout(pad=1.2)
 
-        # Draw normally
-        self._obtained_glow.set_visible(True)
-        self._obtained_line.set_visible(True)
-        for artist in self._scatter_artists:
-            artist.set_visible(True)
-            
-        self.canvas.draw()
+        self._update_artists()
+
+        # Reuse the static layer (pixels + layout) if this material was shown at this size
+        layer = self._static_layers.get(self._layer_key())
+        if layer is None:
+            self.figure.tight_layout(pad=1.2)
+            self._capture_background()
+        else:
+            self.figure.subplots_adjust(**layer[1])
+            self._background = layer[0]
+        self._blit_dynamic(self.figure.bbox)
+
+    def _update_artists(self):
+        """
+        Push the current curve, selection and locks into the existing artists.
+        Point style arrays are only rebuilt when a point changes state.
+        """
+        if self._obtained_line is None:
+            return
+
+        obtained_smooth = self._smooth(self.obtained)
+        self._obtained_glow.set_ydata(obtained_smooth)
+        self._obtained_line.set_ydata(obtained_smooth)
+
+        self._points.set_offsets(np.column_stack((self.sieve_sizes, self.obtained)))
+
+        codes = np.zeros(len(self.sieve_sizes), dtype=int)
+        if self.selected_index is not None:
+            codes[self.selected_index] = 1
+        codes[self._get_locked_graph_mask()] = 2
+        if self._point_codes is not None and np.array_equal(codes, self._point_codes):
+            return
+
+        # Per-point style arrays; paths are matched to offsets by index
+        self._points.set_facecolors(self._POINT_FACE[codes])
+        self._points.set_edgecolors(self._POINT_EDGE[codes])
+        self._points.set_sizes(self._POINT_SIZE[codes])
+        self._points.set_linewidths(self._POINT_WIDTH[codes])
+        self._points.set_paths([self._marker_paths[c] for c in codes])
+        self._point_codes = codes
+
+    def _redraw_graph(self):
+        """Redraw with current data; layout is untouched (see _build_artists)."""
+        if self._obtained_line is None:
+            self._build_artists()
+            return
+        self._update_artists()
+        self.canvas.draw_idle()
+
+    # ----------------------------------------------------
+    # STATIC LAYER CACHE
+    # ----------------------------------------------------
+
+    def _layer_key(self):
+        return (self.material_key, self.smoothing) + tuple(self.canvas.get_width_height())
+
+    def _capture_background(self):
+        """
+        Use the cached static layer (grid, envelope, limit lines, ticks, legend)
+        for this material and canvas size, rasterizing it only on a cache miss.
+        """
+        key = self._layer_key()
+        layer = self._static_layers.get(key)
+        if layer is None:
+            dynamic = (self._obtained_glow, self._obtained_line, self._points)
+            for artist in dynamic:
+                artist.set_visible(False)
+            try:
+                self.canvas.draw()
+                # Whole figure, so tick labels outside the axes are restored on tab switch too
+                region = self.canvas.copy_from_bbox(self.figure.bbox)
+            finally:
+                for artist in dynamic:
+                    artist.set_visible(True)
+
+            params = self.figure.subplotpars
+            layout = dict(left=params.left, right=params.right, bottom=params.bottom, top=params.top)
+            layer = self._static_layers[key] = (region, layout)
+        self._background = layer[0]
+
+    def invalidate_static_layers(self):
+        """Drop cached static layers; call after a resize or a theme/colour change."""
+        self._static_layers.clear()
+        self._background = None
+
+    def _blit_dynamic(self, bbox):
+        """Restore the static layer and draw only the curve + points on top."""
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self._obtained_glow)
+        self.ax.draw_artist(self._obtained_line)
+        self.ax.draw_artist(self._points)
+        self.canvas.blit(bbox)
 
     def _fast_update_curve(self):
         """
-        Fast update during dragging using blitting.
-        Only redraws the dynamic artists (obtained line + scatter points).
-        Falls back to full redraw if background cache is missing.
+        Fast update for drag and keyboard edits using blitting.
+        Only redraws the dynamic artists (obtained line + scatter points);
+        the background is captured on first use after a layout change.
         """
         n = len(self.sieve_sizes)
-        if n == 0:
+        if n == 0 or self._obtained_line is None:
             return
 
-        now = time.time()
-        if (now - self._last_draw_time) < self._min_draw_interval:
-            return  # Throttle: skip this frame
-        self._last_draw_time = now
+        if self._background is None:
+            try:
+                self._capture_background()
+            except Exception:
+                pass  # Backend without blitting: plain redraw below
 
         # If we have a cached background, use blitting
-        if self._background is not None and self._obtained_line is not None:
+        if self._background is not None:
             try:
-                # Restore background
-                self.canvas.restore_region(self._background)
-
-                # Update obtained curve data
-                if n > 2:
-                    x_smooth = np.linspace(0, n - 1, n * 10)
-                    obtained_smooth = np.interp(x_smooth, self.sieve_sizes, self.obtained)
-                else:
-                    obtained_smooth = self.obtained
-
-                self._obtained_glow.set_ydata(obtained_smooth)
-                self._obtained_line.set_ydata(obtained_smooth)
-
-                # Redraw dynamic artists
-                self.ax.draw_artist(self._obtained_glow)
-                self.ax.draw_artist(self._obtained_line)
-
-                # Update scatter points
-                locked_graph = self._get_locked_graph_indices()
-                for i, artist in enumerate(self._scatter_artists):
-                    artist.set_offsets([[self.sieve_sizes[i], self.obtained[i]]])
-
-                    is_locked = i in locked_graph
-                    is_selected = (i == self.selected_index)
-
-                    if is_locked:
-                        artist.set_facecolor("#ef4444")
-                        artist.set_edgecolor("#fca5a5")
-                        artist.set_sizes([100])
-                    elif is_selected:
-                        artist.set_facecolor("#f59e0b")
-                        artist.set_edgecolor("#fbbf24")
-                        artist.set_sizes([130])
-                    else:
-                        artist.set_facecolor("#22d3ee")
-                        artist.set_edgecolor("white")
-                        artist.set_sizes([80])
-
-                    self.ax.draw_artist(artist)
-
-                # Blit the updated region
-                self.canvas.blit(self.ax.bbox)
+                self._update_artists()
+                self._blit_dynamic(self.ax.bbox)
                 return
 
             except Exception:
                 pass  # Fall through to full redraw
 
-        # Fallback: full redraw
+        # Fallback: normal redraw
         self._redraw_graph()
 
     # ----------------------------------------------------
@@ -414,157 +526,161 @@ class GraphPanel(ctk.CTkFrame):
 
         # confirm click within draggable radius
         if abs(self.obtained[index] - event.ydata) < 6:
-            locked_graph = self._get_locked_graph_indices()
+            locked_graph = self._get_locked_graph_mask()
             
             # Don't allow dragging locked points
-            if index in locked_graph:
+            if locked_graph[index]:
                 # Still select it to show info, but don't set drag_index
                 self.selected_index = index
                 self._update_entry_field()
                 self._redraw_graph()
                 return
             
-            # Capture clean background for blitting NOW, right before drag starts
-            self._obtained_glow.set_visible(False)
-            self._obtained_line.set_visible(False)
-            for artist in self._scatter_artists:
-                artist.set_visible(False)
-                
-            self.canvas.draw()
-            self._background = self.canvas.copy_from_bbox(self.ax.bbox)
-            
-            self._obtained_glow.set_visible(True)
-            self._obtained_line.set_visible(True)
-            for artist in self._scatter_artists:
-                artist.set_visible(True)
-                
-            self.ax.draw_artist(self._obtained_glow)
-            self.ax.draw_artist(self._obtained_line)
-            for artist in self._scatter_artists:
-                self.ax.draw_artist(artist)
-            self.canvas.blit(self.ax.bbox)
-
             self.drag_index = index
             self.selected_index = index
+
+            # Blit from the cached static layer (captured only if missing)
+            self._fast_update_curve()
             
             # Compute absolute valid bounds for this drag to prevent breaking limits/locks
-            parent = self.master
-            if hasattr(parent, 'table_panel'):
-                P_min, P_max = self.grad_engine.compute_valid_passing_ranges(
-                    parent.table_panel.retained,
-                    parent.table_panel.locked_rows,
-                    parent.table_panel.lower_limits,
-                    parent.table_panel.upper_limits
-                )
-                table_idx = len(self.obtained) - 1 - index
-                self._drag_min_passing = P_min[table_idx]
-                self._drag_max_passing = P_max[table_idx]
-            else:
-                self._drag_min_passing = 0.0
-                self._drag_max_passing = 100.0
+            P_min, P_max = self.state.passing_bounds().ranges()
+            table_idx = len(self.obtained) - 1 - index
+            self._drag_min_passing = P_min[table_idx]
+            self._drag_max_passing = P_max[table_idx]
                 
             self._drag_start_y = event.ydata
             self._drag_start_value = float(self.obtained[index])
             self._update_entry_field()
 
     def _on_drag(self, event):
-        if self.drag_index is not None:
-            if event.ydata is None:
-                return
-            idx = self.drag_index
-            
-            # Raw coordinate
-            y = event.ydata
-
-            # Apply snap/precision logic
-            if self.shift_held and self._drag_start_y is not None:
-                # Precision mode: scale movement by 0.1
-                delta = event.ydata - self._drag_start_y
-                y = self._drag_start_value + delta * 0.1
-            else:
-                # Apply snap
-                y = self._apply_snap(y)
-            
-            # Strictly clamp to physically valid mathematical limits
-            if hasattr(self, '_drag_min_passing'):
-                y = max(self._drag_min_passing, min(self._drag_max_passing, y))
-            else:
-                y = max(self.lower[idx], min(self.upper[idx], y))
+        """Record the latest pointer position; the work happens once per frame."""
+        if self.drag_index is None or event.ydata is None:
+            return
 
-            # Store the proposed y
-            self.obtained[idx] = y
+        self._pending_drag_y = event.ydata
+        if self._drag_frame_job is None:
+            self._drag_frame_job = self.after(self.drag_frame_ms, self._process_drag_frame)
+
+    def _process_drag_frame(self):
+        """
+        Apply the latest pointer position: settle the curve and blit the graph.
+        Table + FM are synced only every drag_sync_ms (and always on release).
+        """
+        self._drag_frame_job = None
+        y = self._pending_drag_y
+        self._pending_drag_y = None
+        if self.drag_index is None or y is None:
+            return
+        idx = self.drag_index
+
+        # Apply snap/precision logic
+        if self.shift_held and self._drag_start_y is not None:
+            # Precision mode: scale movement by 0.1
+            delta = y - self._drag_start_y
+            y = self._drag_start_value + delta * 0.1
+        else:
+            # Apply snap
+            y = self._apply_snap(y)
+        
+        # Strictly clamp to physically valid mathematical limits
+        if hasattr(self, '_drag_min_passing'):
+            y = max(self._drag_min_passing, min(self._drag_max_passing, y))
+        else:
+            y = max(self.env_lower[idx], min(self.env_upper[idx], y))
+
+        # Store the proposed y
+        self.obtained[idx] = y
 
         # Enforce monotonicity in graph order (non-decreasing left→right)
-        locked_graph = self._get_locked_graph_indices()
-        self.obtained = self.grad_engine.enforce_monotonicity_graph_order(
-            self.obtained, self.lower, self.upper, locked_graph
-        )
+        locked_graph = self._get_locked_graph_mask()
+        self._settle_curve(locked_graph, idx if self.state.passing_bounds().feasible else None)
 
         self._update_entry_field()
 
-        # Update retained + table
-        self._sync_back()
-
         # Fast blit redraw
         self._fast_update_curve()
 
+        # Update retained + table at the lower rate
+        now = time.time()
+        if (now - self._last_sync_time) * 1000 >= self.drag_sync_ms:
+            self._last_sync_time = now
+            self._sync_back()
+
     def _on_release(self, event):
         if self.drag_index is not None:
-            # Do a final full redraw for clean visuals
+            # Apply the last pointer position still waiting for a frame
+            if self._drag_frame_job is not None:
+                self.after_cancel(self._drag_frame_job)
+                self._drag_frame_job = None
+                self._process_drag_frame()
+
+            # Final full sync + clean redraw
+            self._sync_back()
             self._redraw_graph()
         self.drag_index = None
+        self._pending_drag_y = None
         self._drag_start_y = None
         self._drag_start_value = None
 
     def _on_resize(self, event):
-        """Handle window resize."""
-        # Matplotlib handles resize normally. We don't need to manually redraw
-        # since we now capture the blitting background only on click.
-        pass
+        """Handle window resize: the only layout pass besides material change."""
+        self.invalidate_static_layers()
+        if self._obtained_line is not None:
+            self.figure.tight_layout(pad=1.2)
+            self.canvas.draw_idle()
 
     def _on_key_up(self, event):
         """Handle Up arrow key to increase selected point's passing %"""
-        if self.selected_index is not None:
-            locked_graph = self._get_locked_graph_indices()
-            if self.selected_index in locked_graph:
-                return  # Can't move locked points
-
-            step = self.step_size * (0.1 if self.shift_held else 1.0)
-            new_val = self.obtained[self.selected_index] + step
-            new_val = self._apply_snap(new_val)
-            new_val = max(self.lower[self.selected_index], min(self.upper[self.selected_index], new_val))
-            self.obtained[self.selected_index] = new_val
-
-            # Enforce monotonicity
-            self.obtained = self.grad_engine.enforce_monotonicity_graph_order(
-                self.obtained, self.lower, self.upper, locked_graph
-            )
-
-            self._update_entry_field()
-            self._sync_back()
-            self._redraw_graph()
+        self._nudge_selected(1)
 
     def _on_key_down(self, event):
         """Handle Down arrow key to decrease selected point's passing %"""
-        if self.selected_index is not None:
-            locked_graph = self._get_locked_graph_indices()
-            if self.selected_index in locked_graph:
-                return  # Can't move locked points
+        self._nudge_selected(-1)
 
-            step = self.step_size * (0.1 if self.shift_held else 1.0)
-            new_val = self.obtained[self.selected_index] - step
-            new_val = self._apply_snap(new_val)
-            new_val = max(self.lower[self.selected_index], min(self.upper[self.selected_index], new_val))
-            self.obtained[self.selected_index] = new_val
-
-            # Enforce monotonicity
-            self.obtained = self.grad_engine.enforce_monotonicity_graph_order(
-                self.obtained, self.lower, self.upper, locked_graph
-            )
-
-            self._update_entry_field()
-            self._sync_back()
-            self._redraw_graph()
+    def _nudge_selected(self, direction):
+        """
+        Step the selected point by one arrow-key step. Every key press moves the
+        value, but settle / sync / draw run once per frame, so an auto-repeat
+        burst costs one update instead of one redraw per key.
+        """
+        index = self.selected_index
+        if index is None:
+            return
+        if self._get_locked_graph_mask()[index]:
+            return  # Can't move locked points
+
+        step = self.step_size * (0.1 if self.shift_held else 1.0)
+        new_val = self.obtained[index] + direction * step
+        new_val = self._apply_snap(new_val)
+        new_val = max(self.env_lower[index], min(self.env_upper[index], new_val))
+        self.obtained[index] = self._clamp_to_locks(index, new_val)
+
+        self._edit_index = index
+        if self._edit_frame_job is None:
+            self._edit_frame_job = self.after(self.drag_frame_ms, self._process_edit_frame)
+
+    def _process_edit_frame(self):
+        """Settle, sync and blit the point edited by the last key burst."""
+        self._edit_frame_job = None
+        if self._edit_index is None:
+            return
+        self._apply_point_edit(self._edit_index)
+        self._edit_index = None
+
+    def _clamp_to_locks(self, index, value):
+        """Clamp value for graph point index to the range the locks leave it (as drags do)."""
+        P_min, P_max = self.state.passing_bounds().ranges()
+        table_idx = len(self.obtained) - 1 - index
+        return max(P_min[table_idx], min(P_max[table_idx], value))
+
+    def _apply_point_edit(self, index):
+        # Enforce monotonicity around the edited point, then update table/FM + blit.
+        # If the locks conflict, no value is safe to hold, so the point is not pinned.
+        pinned = index if self.state.passing_bounds().feasible else None
+        self._settle_curve(self._get_locked_graph_mask(), pinned)
+        self._update_entry_field()
+        self._sync_back()
+        self._fast_update_curve()
 
     def _on_key_up_tkinter(self, event):
         """Tkinter version of Up arrow handler"""
@@ -596,8 +712,8 @@ class GraphPanel(ctk.CTkFrame):
         if self.selected_index is None:
             return
         
-        locked_graph = self._get_locked_graph_indices()
-        if self.selected_index in locked_graph:
+        locked_graph = self._get_locked_graph_mask()
+        if locked_graph[self.selected_index]:
             return  # Can't edit locked points
         
         try:
@@ -608,61 +724,20 @@ class GraphPanel(ctk.CTkFrame):
             return
         
         # Clamp to limits
-        value = max(self.lower[self.selected_index], min(self.upper[self.selected_index], value))
+        value = max(self.env_lower[self.selected_index], min(self.env_upper[self.selected_index], value))
         value = self._apply_snap(value)
-        self.obtained[self.selected_index] = value
-        
-        # Enforce monotonicity
-        self.obtained = self.grad_engine.enforce_monotonicity_graph_order(
-            self.obtained, self.lower, self.upper, locked_graph
-        )
+        self.obtained[self.selected_index] = self._clamp_to_locks(self.selected_index, value)
         
-        self._update_entry_field()
-        self._sync_back()
-        self._redraw_graph()
+        self._apply_point_edit(self.selected_index)
 
     def _on_entry_key_up(self, event):
         """Handle Up arrow key in entry field"""
-        if self.selected_index is not None:
-            locked_graph = self._get_locked_graph_indices()
-            if self.selected_index in locked_graph:
-                return "break"
-
-            step = self.step_size * (0.1 if self.shift_held else 1.0)
-            new_val = self.obtained[self.selected_index] + step
-            new_val = self._apply_snap(new_val)
-            new_val = max(self.lower[self.selected_index], min(self.upper[self.selected_index], new_val))
-            self.obtained[self.selected_index] = new_val
-
-            self.obtained = self.grad_engine.enforce_monotonicity_graph_order(
-                self.obtained, self.lower, self.upper, locked_graph
-            )
-
-            self._update_entry_field()
-            self._sync_back()
-            self._redraw_graph()
+        self._nudge_selected(1)
         return "break"  # Prevent default behavior
 
     def _on_entry_key_down(self, event):
         """Handle Down arrow key in entry field"""
-        if self.selected_index is not None:
-            locked_graph = self._get_locked_graph_indices()
-            if self.selected_index in locked_graph:
-                return "break"
-
-            step = self.step_size * (0.1 if self.shift_held else 1.0)
-            new_val = self.obtained[self.selected_index] - step
-            new_val = self._apply_snap(new_val)
-            new_val = max(self.lower[self.selected_index], min(self.upper[self.selected_index], new_val))
-            self.obtained[self.selected_index] = new_val
-
-            self.obtained = self.grad_engine.enforce_monotonicity_graph_order(
-                self.obtained, self.lower, self.upper, locked_graph
-            )
-
-            self._update_entry_field()
-            self._sync_back()
-            self._redraw_graph()
+        self._nudge_selected(-1)
         return "break"  # Prevent default behavior
 
     # ----------------------------------------------------
@@ -670,43 +745,20 @@ class GraphPanel(ctk.CTkFrame):
     # ----------------------------------------------------
 
     def _sync_back(self):
-        # Skip if we're updating from table (prevent circular updates)
-        if self.updating_from_table:
-            return
-            
-        parent = self.master
+        state = self.state
 
-        # Reverse obtained curve from graph order (small to large) back to table order (large to small)
-        table_passing = list(reversed(self.obtained))
-        
+        # Graph edits were written straight into the shared passing buffer (table order)
         # Protect locked retained weights!
         # If user dragged a point, it creates a proposed passing curve. We must snap it to respect locks.
         final_passing, retained = self.grad_engine.sync_passing_with_locks(
-            table_passing, 
-            parent.table_panel.retained, 
-            parent.table_panel.locked_rows, 
-            parent.table_panel.lower_limits, 
-            parent.table_panel.upper_limits
+            state.passing, 
+            state.retained, 
+            state.locked_rows, 
+            self.spec.env_lower,
+            self.spec.env_upper
         )
         
         # The graph might have been forced to snap to satisfy the locked retained weights.
-        self.obtained = np.array(list(reversed(final_passing)), dtype=float)
-
-        # Update both passing and retained in table atomically
-        parent.table_panel.passing = final_passing
-        parent.table_panel.retained = retained
-        parent.table_panel._refresh_table()
-
-        # update FM
-        parent.input_panel.update_fm(retained)
-
-    # ----------------------------------------------------
-
-    def update_curve(self, new_curve):
-        """Update curve from table edits"""
-        # new_curve is in table order (largest to smallest)
-        # Reverse to graph order (smallest to largest for left-to-right display)
-        self.obtained = np.array(list(reversed(new_curve)), dtype=float)
-        self.updating_from_table = True
-        self._redraw_graph()
-        self.updating_from_table = False
\ No newline at end of file
+        # Written back in place; table + FM refresh from the (coalesced) state notification,
+        # this panel has already drawn the edit itself.
+        state.set_curve(final_passing, retained, source=self)
\ No newline at end of file
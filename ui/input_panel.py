@@ -1,7 +1,9 @@
 import customtkinter as ctk
 from core.random_generator import RandomCurveGenerator
-from core.fm_calculator import FMCalculator
-from config.materials import materials
+from core.fm_calculator import FMCalculator, ZONE_NAMES, ZONED_MATERIALS
+from core.gradation_engine import GradationEngine
+from core.gradation_state import MATERIAL, RETAINED
+from core.material_spec import get_spec
 import numpy as np
 
 class InputPanel(ctk.CTkFrame):
@@ -10,12 +12,19 @@ class InputPanel(ctk.CTkFrame):
         super().__init__(parent, fg_color="#1a1f2e", corner_radius=15, width=220)
 
         self.material_key = "fine"
-        self.data = materials[self.material_key]
+        self.spec = get_spec(self.material_key)
 
         self.total_weight_manager = total_weight_manager
-        self.random_gen = RandomCurveGenerator()
+        self.random_gen = RandomCurveGenerator(GradationEngine(total_weight_manager))
         self.fm_calc = FMCalculator()
 
+        # Weight entry is applied once typing settles for this long
+        self.weight_debounce_ms = 400
+        self._weight_job = None
+
+        self.state = parent.state
+        self.state.subscribe(self._on_state_change, (MATERIAL, RETAINED))
+
         self._build_ui()
 
     def _build_ui(self):
@@ -44,7 +53,10 @@ class InputPanel(ctk.CTkFrame):
         self.total_entry.insert(0, "2000")
         self.total_entry.pack(pady=8)
 
-        self.total_entry.bind("<KeyRelease>", lambda e: self._on_change_total_weight())
+        # Typing is debounced; Enter / leaving the field applies at once
+        self.total_entry.bind("<KeyRelease>", self._on_weight_key)
+        self.total_entry.bind("<Return>", lambda e: self._apply_weight_now())
+        self.total_entry.bind("<FocusOut>", lambda e: self._apply_weight_now())
         
         # Set initial total weight
         self._on_change_total_weight()
@@ -93,43 +105,53 @@ class InputPanel(ctk.CTkFrame):
 
     def load_material(self, material_key):
         self.material_key = material_key
-        self.data = materials[material_key]
+        self.spec = get_spec(material_key)
+
+        # A weight typed for the previous material is dropped
+        if self._weight_job is not None:
+            self.after_cancel(self._weight_job)
+            self._weight_job = None
         
-        # Set material-specific default weight
-        default_weight = self.data.get("default_weight", 5000)
-        self.set_weight_display(default_weight)
+        # The state already applied the material default weight; just show it
+        self.set_weight_display(self.total_weight_manager.get_total_weight())
 
     def set_weight_display(self, value):
-        """Update the weight entry field and propagate the change."""
+        """Update the weight entry field (the state owns the weight itself)."""
         self.total_entry.delete(0, "end")
         self.total_entry.insert(0, str(int(value)))
-        self._on_change_total_weight()
+
+    def _on_state_change(self, changed):
+        if MATERIAL in changed:
+            self.load_material(self.state.material_key)
+        self.update_fm(self.state.retained)
 
     def update_fm(self, retained_list):
         fm_value = self.fm_calc.calculate_fm(retained_list)
         self.fm_label.configure(text=f"Fineness Modulus: {fm_value:.3f}")
 
         # Show zone classification for sand materials
-        if self.material_key in ("fine", "finesand"):
-            if fm_value < 2.2:
-                zone = "Zone IV (Very Fine)"
-                color = "#f59e0b"
-            elif fm_value < 2.6:
-                zone = "Zone III (Fine)"
-                color = "#22c55e"
-            elif fm_value < 2.9:
-                zone = "Zone II (Medium) ✓"
-                color = "#22c55e"
-            elif fm_value < 3.2:
-                zone = "Zone I (Coarse)"
-                color = "#f59e0b"
-            else:
-                zone = "Zone I (Coarse)"
-                color = "#f59e0b"
+        if self.material_key in ZONED_MATERIALS:
+            zone_index = int(self.fm_calc.classify_zone(fm_value))
+            zone = ZONE_NAMES[zone_index]
+            if zone_index == 2:
+                zone += " ✓"
+            color = "#22c55e" if zone_index in (1, 2) else "#f59e0b"
             self.fm_zone_label.configure(text=zone, text_color=color)
         else:
             self.fm_zone_label.configure(text="")
 
+    def _on_weight_key(self, event):
+        """Restart the debounce timer: partial inputs ("1" → "10000") are never applied."""
+        if self._weight_job is not None:
+            self.after_cancel(self._weight_job)
+        self._weight_job = self.after(self.weight_debounce_ms, self._apply_weight_now)
+
+    def _apply_weight_now(self):
+        if self._weight_job is not None:
+            self.after_cancel(self._weight_job)
+            self._weight_job = None
+        self._on_change_total_weight()
+
     def _on_change_total_weight(self):
         try:
             weight = float(self.total_entry.get())
@@ -139,35 +161,26 @@ class InputPanel(ctk.CTkFrame):
         if weight <= 0:
             return
 
-        self.total_weight_manager.set_total_weight(weight)
-        
-        # Trigger table update with recalculated retained values
-        parent = self.master
-        if hasattr(parent, 'table_panel'):
-            # Recalculate retained values based on new total weight
-            passing = parent.table_panel.passing
-            retained = parent.table_panel.grad_engine.passing_to_retained(passing)
-            parent.table_panel.update_retained(retained)
-            # Update FM display
-            self.update_fm(retained)
+        # Retained is rescaled by the state; the table refreshes from its notification
+        # (FM does not depend on the total weight)
+        self.state.set_total_weight(weight)
 
     def _generate_random(self):
-        parent = self.master
-
-        # Get limits from table panel (original order: largest to smallest)
-        lower, upper = parent.table_panel.get_limits()
-        sieve_sizes = parent.table_panel.get_sieve_sizes()
+        state = self.state
+        spec = state.spec
+        locked_mask = state.locked_mask
+        old_retained = list(state.retained)
+
+        # Generate random curve in table order (largest to smallest),
+        # keeping locked retained weights exact
+        random_curve = self.random_gen.generate(
+            spec.sieve_sizes, spec.lower, spec.upper, locked_rows=locked_mask, retained=old_retained,
+            spec=spec
+        )
 
-        # Generate random curve in table order (largest to smallest)
-        random_curve = self.random_gen.generate(sieve_sizes, lower, upper)
+        retained = self.random_gen.grad_engine.passing_to_retained(random_curve)
+        for i in np.flatnonzero(locked_mask):
+            retained[i] = old_retained[i]  # Avoid float round-trip drift on locked rows
 
-        # Update table with new passing curve
-        parent.table_panel.update_passing(random_curve)
-        
-        # Update graph (it will reverse internally for display)
-        parent.graph_panel.update_curve(random_curve)
-        
-        # Recalculate retained and update FM
-        retained = parent.table_panel.grad_engine.passing_to_retained(random_curve)
-        parent.table_panel.update_retained(retained)
-        self.update_fm(retained)
+        # One notification: table, graph and FM each refresh once
+        state.set_curve(random_curve, retained)
@@ -1,30 +1,49 @@
 import customtkinter as ctk
+import numpy as np
 from tkinter import ttk
-from config.materials import materials
+from core.material_spec import get_spec
 from core.fm_calculator import FMCalculator
 from core.gradation_engine import GradationEngine
+from core.gradation_state import MATERIAL, PASSING, RETAINED, LOCKS, WEIGHT
 
 class TablePanel(ctk.CTkFrame):
 
+    EDIT_HINT = "Double-click to edit  % Passing  or  Weight Retained  |  🔒 = value protected"
+    HINT_COLOR = "#64748b"
+    WARNING_COLOR = "#f59e0b"
+
     def __init__(self, parent, total_weight_manager):
         super().__init__(parent, fg_color="#1a1f2e", corner_radius=12)
 
         self.material_key = "fine"
-        self.data = materials[self.material_key]
+        self.spec = get_spec(self.material_key)
 
         self.fm_calc = FMCalculator()
         self.total_weight_manager = total_weight_manager
         self.grad_engine = GradationEngine(total_weight_manager)
 
+        # Shared curve, retained weights and lock mask live in the app's GradationState
+        self.state = parent.state
+        self.state.subscribe(self._on_state_change, (MATERIAL, PASSING, RETAINED, LOCKS, WEIGHT))
+
         self.sieve_sizes = []
         self.lower_limits = []
         self.upper_limits = []
-        self.passing = []
-        self.retained = []
-        self.locked_rows = set()  # Track which row indices are locked
 
         self._active_entry = None  # Track active edit entry
 
+        # Persistent Treeview rows for the current material (see _build_rows)
+        self._row_ids = []
+        self._shown_rows = []
+
+        # Allowed retained [min, max] per row, computed on first hover after a change
+        self._retained_ranges = None
+        self._hint_text = None
+
+        # A rejected lock's explanation stays in the hint bar this long (ms)
+        self.warning_ms = 4000
+        self._warning_job = None
+
         self._build_ui()
         self._init_table_data()
 
@@ -42,9 +61,9 @@ class TablePanel(ctk.CTkFrame):
 
         self.edit_hint = ctk.CTkLabel(
             header,
-            text="Double-click to edit  % Passing  or  Weight Retained  |  🔒 = value protected",
+            text=self.EDIT_HINT,
             font=("Segoe UI", 10, "italic"),
-            text_color="#64748b"
+            text_color=self.HINT_COLOR
         )
         self.edit_hint.pack(side="right")
 
@@ -109,6 +128,8 @@ class TablePanel(ctk.CTkFrame):
         self.table.pack(fill="both", expand=True)
         self.table.bind("<Double-1>", self._begin_edit)
         self.table.bind("<ButtonRelease-1>", self._on_click)
+        self.table.bind("<Motion>", self._on_hover)
+        self.table.bind("<Leave>", lambda e: self._show_hint(self.EDIT_HINT))
 
         # Summary bar showing total retained weight
         summary = ctk.CTkFrame(self, fg_color="#252d3d", corner_radius=8, height=38)
@@ -139,78 +160,136 @@ class TablePanel(ctk.CTkFrame):
 
     def load_material(self, material_key):
         self.material_key = material_key
-        self.data = materials[material_key]
+        self.spec = get_spec(material_key)
 
         # Keep original order for calculations (largest to smallest/Pan)
-        self.sieve_sizes = self.data["sieve_sizes"]
-        self.lower_limits = self.data["lower_limits"]
-        self.upper_limits = self.data["upper_limits"]
-        self.locked_rows = set()  # Reset locks on material change
-        
-        # Initialize passing and retained with middle values between limits
-        row_count = len(self.sieve_sizes)
-        self.passing = [(self.lower_limits[i] + self.upper_limits[i]) / 2 for i in range(row_count)]
-        
-        # Enforce monotonicity on initial values
-        self.passing = self.grad_engine.enforce_monotonicity_table_order(
-            self.passing, self.lower_limits, self.upper_limits
-        )
-        
-        # Calculate retained from passing values using gradation engine
-        self.retained = self.grad_engine.passing_to_retained(self.passing)
+        self.sieve_sizes = self.spec.sieve_sizes
+        self.lower_limits = self.spec.lower
+        self.upper_limits = self.spec.upper
 
+        self._build_rows()
+
+    def _on_state_change(self, changed):
+        """One refresh per flush, whatever combination of edits caused it."""
+        if MATERIAL in changed:
+            self.load_material(self.state.material_key)
         self._refresh_table()
 
+    def _build_rows(self):
+        """
+        Create one persistent Treeview item per sieve. Only done on material change;
+        _refresh_table then edits these items in place.
+        """
+        self.table.delete(*self.table.get_children())
+
+        n = len(self.sieve_sizes)
+        self._row_ids = [self.table.insert("", "end") for _ in range(n)]
+        self._row_labels = [
+            (self.sieve_sizes[i], f"{self.lower_limits[i]:.0f}", f"{self.upper_limits[i]:.0f}")
+            for i in range(n)
+        ]
+
+        # Format cache: raw values and (values, tag) currently shown per row.
+        # NaN never compares equal, so every row is filled on the first refresh.
+        self._shown_passing = np.full(n, np.nan)
+        self._shown_retained = np.full(n, np.nan)
+        self._shown_locked = np.zeros(n, dtype=bool)
+        self._shown_rows = [None] * n
+        self._summary_text = None
+
+    def _row_tag(self, i, is_locked):
+        # Alternating row colors, with locked variants
+        if self.sieve_sizes[i] == "Pan":
+            tag = "panrow"
+        elif i % 2 == 0:
+            tag = "evenrow"
+        else:
+            tag = "oddrow"
+        return "locked_" + tag if is_locked else tag
 
     def _refresh_table(self):
-        self.table.delete(*self.table.get_children())
+        """
+        Update only the rows whose passing, retained or lock state changed.
+        Unchanged rows are neither reformatted nor touched in the Treeview.
+        """
+        self._retained_ranges = None
 
-        total_retained = 0.0
-        for i in range(len(self.sieve_sizes)):
-            retained_val = self.retained[i]
-            total_retained += retained_val
-
-            # Alternating row colors
-            if self.sieve_sizes[i] == "Pan":
-                tag = "panrow"
-            elif i % 2 == 0:
-                tag = "evenrow"
-            else:
-                tag = "oddrow"
-
-            lock_icon = "[ Locked ]" if i in self.locked_rows else "[   ]"
-
-            # Use locked tag variants for locked rows
-            if i in self.locked_rows:
-                if self.sieve_sizes[i] == "Pan":
-                    tag = "locked_panrow"
-                elif i % 2 == 0:
-                    tag = "locked_evenrow"
-                else:
-                    tag = "locked_oddrow"
-
-            row = (
-                self.sieve_sizes[i],
-                f"{self.lower_limits[i]:.0f}",
-                f"{self.upper_limits[i]:.0f}",
-                f"{self.passing[i]:.2f}",
-                f"{retained_val:.1f}",
-                lock_icon
+        passing = self.state.passing
+        retained = np.asarray(self.state.retained, dtype=float)
+        locked = self.state.locked_mask
+        if len(passing) != len(self._shown_rows) or len(retained) != len(passing):
+            return
+
+        changed = (
+            (passing != self._shown_passing)
+            | (retained != self._shown_retained)
+            | (locked != self._shown_locked)
+        )
+        for i in np.flatnonzero(changed):
+            is_locked = bool(locked[i])
+            row = self._row_labels[i] + (
+                f"{passing[i]:.2f}",
+                f"{retained[i]:.1f}",
+                "[ Locked ]" if is_locked else "[   ]"
             )
-            self.table.insert("", "end", values=row, tags=(tag,))
+            shown = (row, self._row_tag(i, is_locked))
+
+            # Values can change below display precision; skip the widget call then
+            if shown != self._shown_rows[i]:
+                self.table.item(self._row_ids[i], values=row, tags=(shown[1],))
+                self._shown_rows[i] = shown
+
+        self._shown_passing[:] = passing
+        self._shown_retained[:] = retained
+        self._shown_locked[:] = locked
 
         # Update summary bar
+        total_retained = retained.sum()
         target = self.total_weight_manager.get_total_weight()
         diff = abs(total_retained - target)
-        self.total_retained_label.configure(text=f"∑ Total Retained: {total_retained:.1f} g")
+        total_text = f"∑ Total Retained: {total_retained:.1f} g"
 
         if diff < 1:
-            self.status_label.configure(text="✓ Balanced", text_color="#22c55e")
+            status = ("✓ Balanced", "#22c55e")
         else:
-            self.status_label.configure(
-                text=f"⚠ Off by {diff:.1f}g (target: {target:.0f}g)",
-                text_color="#f59e0b"
-            )
+            status = (f"⚠ Off by {diff:.1f}g (target: {target:.0f}g)", "#f59e0b")
+
+        if (total_text, status) != self._summary_text:
+            self.total_retained_label.configure(text=total_text)
+            self.status_label.configure(text=status[0], text_color=status[1])
+            self._summary_text = (total_text, status)
+
+    # ----------------------------------------------------
+    # RETAINED RANGE HINT
+    # ----------------------------------------------------
+
+    def _on_hover(self, event):
+        """Show the allowed retained range of the row under the cursor's Weight Retained cell."""
+        row_id = self.table.identify_row(event.y)
+        if not row_id or self.table.identify_column(event.x) != "#5":
+            self._show_hint(self.EDIT_HINT)
+            return
+
+        row_index = self.table.index(row_id)
+        if row_index >= len(self._row_ids):
+            return
+
+        # All rows in one O(n) pass, reused until the next table refresh
+        if self._retained_ranges is None:
+            self._retained_ranges = self.state.passing_bounds().retained_ranges()
+        low, high = self._retained_ranges
+
+        self._show_hint(
+            f"{self.sieve_sizes[row_index]} mm: allowed retained "
+            f"{low[row_index]:.1f} – {high[row_index]:.1f} g"
+        )
+
+    def _show_hint(self, text):
+        if self._warning_job is not None:
+            return  # Leave the rejection message up until it times out
+        if text != self._hint_text:
+            self.edit_hint.configure(text=text)
+            self._hint_text = text
 
     # ----------------------------------------------------
     # EDITING
@@ -239,7 +318,7 @@ class TablePanel(ctk.CTkFrame):
 
         # Don't allow editing locked rows
         row_index = self.table.index(row_id)
-        if row_index in self.locked_rows:
+        if self.state.locked_mask[row_index]:
             return
 
         bbox = self.table.bbox(row_id, col)
@@ -298,31 +377,28 @@ class TablePanel(ctk.CTkFrame):
         elif col_index == 4:  # Weight retained edited
             self._handle_retained_edit(row_index, new_val)
 
-        self._refresh_table()
-
-        # Sync graph + FM
-        parent = self.master
-        parent.graph_panel.update_curve(self.passing)
-        parent.input_panel.update_fm(self.retained)
+        # Table, graph and FM all refresh from the state notification
+        self.state.mark_dirty(PASSING, RETAINED)
 
     def _handle_passing_edit(self, row_index, new_val):
         """
         Handle editing of % Passing value.
-        - Clamp to [lower_limit, upper_limit]
+        - Clamp to the margin envelope (the limits the lock checks use)
         - Sync to ensure we NEVER change locked retained weights
         """
-        # Clamp to limits
-        new_val = max(self.lower_limits[row_index], min(self.upper_limits[row_index], new_val))
-        self.passing[row_index] = new_val
+        env_lower, env_upper = self.spec.envelope
+        new_val = max(env_lower[row_index], min(env_upper[row_index], new_val))
+        self.state.passing[row_index] = new_val
 
         # Sync using the engine to protect locked retained values
-        self.passing, self.retained = self.grad_engine.sync_passing_with_locks(
-            self.passing, 
-            self.retained, 
-            self.locked_rows, 
-            self.lower_limits, 
-            self.upper_limits
+        final_passing, self.state.retained = self.grad_engine.sync_passing_with_locks(
+            self.state.passing, 
+            self.state.retained, 
+            self.state.locked_rows,
+            env_lower,
+            env_upper
         )
+        self.state.passing[:] = final_passing
 
     def _handle_retained_edit(self, row_index, new_val):
         """
@@ -333,22 +409,19 @@ class TablePanel(ctk.CTkFrame):
         - Recalculate passing from the adjusted retained values
         """
         # Calculate the absolute mathematical bounds for this row to stay inside limits
-        min_val, max_val = self.grad_engine.compute_valid_retained_range(
-            row_index, self.retained, self.locked_rows,
-            self.lower_limits, self.upper_limits
-        )
+        min_val, max_val = self.state.passing_bounds().retained_range(row_index)
 
         # Auto-clamp user input so it NEVER breaks limits
         new_val = max(min_val, min(new_val, max_val))
 
         # Use engine to redistribute among unlocked rows
-        self.retained = self.grad_engine.adjust_retained_with_locks(
-            self.retained, row_index, new_val, self.locked_rows
+        self.state.retained = self.grad_engine.adjust_retained_with_locks(
+            self.state.retained, row_index, new_val, self.state.locked_rows
         )
 
         # Recalculate passing from the adjusted retained
         # Since all retained values are >= 0, passing is guaranteed to be monotonic.
-        self.passing = self.grad_engine.retained_to_passing(self.retained)
+        self.state.passing[:] = self.grad_engine.retained_to_passing(self.state.retained)
 
     # ----------------------------------------------------
     # PUBLIC API
@@ -360,14 +433,6 @@ class TablePanel(ctk.CTkFrame):
     def get_sieve_sizes(self):
         return self.sieve_sizes
 
-    def update_passing(self, new_curve):
-        self.passing = list(new_curve)
-        self._refresh_table()
-
-    def update_retained(self, new_retained):
-        self.retained = list(new_retained)
-        self._refresh_table()
-
     # ----------------------------------------------------
     # LOCK TOGGLE
     # ----------------------------------------------------
@@ -391,14 +456,28 @@ class TablePanel(ctk.CTkFrame):
 
         row_index = self.table.index(row_id)
 
-        if row_index in self.locked_rows:
-            self.locked_rows.discard(row_index)
-        else:
-            self.locked_rows.add(row_index)
-
-        self._refresh_table()
-        
-        # Also update graph to show lock status on points
-        parent = self.master
-        if hasattr(parent, 'graph_panel'):
-            parent.graph_panel._redraw_graph()
+        if not self.state.locked_mask[row_index]:
+            # Locking pins the row's current weight; refuse lock sets no curve can satisfy.
+            # (Unlocking only relaxes the constraints, so it never needs checking.)
+            proposed = self.state.locked_mask.copy()
+            proposed[row_index] = True
+            report = self.state.check_locks(proposed)
+            if not report.feasible:
+                self._show_warning(report.describe(self.sieve_sizes))
+                return
+
+        # Table and graph (lock markers) refresh from the state notification
+        self.state.toggle_lock(row_index)
+
+    def _show_warning(self, text):
+        """Show text in the hint bar, in amber, for warning_ms."""
+        if self._warning_job is not None:
+            self.after_cancel(self._warning_job)
+        self._warning_job = self.after(self.warning_ms, self._clear_warning)
+        self.edit_hint.configure(text=f"⚠ {text}", text_color=self.WARNING_COLOR)
+        self._hint_text = None
+
+    def _clear_warning(self):
+        self._warning_job = None
+        self.edit_hint.configure(text_color=self.HINT_COLOR)
+        self._show_hint(self.EDIT_HINT)